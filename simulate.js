@@ -32,7 +32,8 @@ import {
   updateExplosion,
   updateGameState,
 } from './src/game.js';
-import { GameEnv } from './src/game-env.js';
+import { ACTION_MAP, GameEnv } from './src/game-env.js';
+import { OBSERVATION_SIZE } from './src/observation.js';
 import { createShip, SHIP_SIZE, updateShip } from './src/ship.js';
 import { createSimulation, updateSimulation } from './src/simulation.js';
 
@@ -65,6 +66,7 @@ export function parseArgs(argv) {
     speed: 1.0,
     thrust: 2000,
     bridge: false,
+    bridgeBinary: false,
   };
 
   for (let i = 0; i < argv.length; i++) {
@@ -105,6 +107,10 @@ export function parseArgs(argv) {
       case '--bridge':
         config.bridge = true;
         break;
+      case '--bridge-binary':
+        config.bridge = true;
+        config.bridgeBinary = true;
+        break;
     }
   }
 
@@ -656,6 +662,25 @@ function printDetection(det) {
 
 // ── Bridge ───────────────────────────────────────────────────────────────
 
+/**
+ * Advance the environment by one step, converting failures into error messages.
+ *
+ * @param {GameEnv|null} env - current environment (null if not yet reset)
+ * @param {number} action - movement action index
+ * @param {number} fire - fire action (0 or 1)
+ * @returns {{ result?: object, error?: string }}
+ */
+function stepEnv(env, action, fire) {
+  if (env === null) {
+    return { error: 'Environment not initialized. Call reset first.' };
+  }
+  try {
+    return { result: env.step(action, fire) };
+  } catch (err) {
+    return { error: `Invalid action: ${err.message}` };
+  }
+}
+
 /**
  * Process a single JSON-lines command for the Python bridge.
  * Pure function: takes current env (or null) and a raw JSON string,
@@ -676,7 +701,17 @@ export function processCommand(env, line) {
       env,
     };
   }
+  return dispatchCommand(env, parsed);
+}
 
+/**
+ * Execute an already-parsed bridge command against one environment.
+ *
+ * @param {GameEnv|null} env - current environment (null if not yet reset)
+ * @param {object} parsed - decoded command object
+ * @returns {{ response: object, shouldExit: boolean, env: GameEnv|null }}
+ */
+function dispatchCommand(env, parsed) {
   switch (parsed.command) {
     case 'reset': {
       const newEnv = new GameEnv();
@@ -688,32 +723,20 @@ export function processCommand(env, line) {
       };
     }
     case 'step': {
-      if (env === null) {
-        return {
-          response: { error: 'Environment not initialized. Call reset first.' },
-          shouldExit: false,
-          env,
-        };
-      }
-      try {
-        const result = env.step(parsed.action, parsed.fire ?? 0);
-        return {
-          response: {
-            observation: Array.from(result.observation),
-            reward: result.reward,
-            done: result.done,
-            info: result.info,
-          },
-          shouldExit: false,
-          env,
-        };
-      } catch (err) {
-        return {
-          response: { error: `Invalid action: ${err.message}` },
-          shouldExit: false,
-          env,
-        };
+      const { result, error } = stepEnv(env, parsed.action, parsed.fire ?? 0);
+      if (error) {
+        return { response: { error }, shouldExit: false, env };
       }
+      return {
+        response: {
+          observation: Array.from(result.observation),
+          reward: result.reward,
+          done: result.done,
+          info: result.info,
+        },
+        shouldExit: false,
+        env,
+      };
     }
     case 'close': {
       return { response: { status: 'closed' }, shouldExit: true, env };
@@ -746,6 +769,257 @@ async function runBridge() {
   process.exit(0);
 }
 
+// ── Binary Bridge ───────────────────────────────────────────────────────
+//
+// Framing used by `--bridge-binary` (must match training/env.py):
+//   command  JSON: u8 opcode=0, u32 length, UTF-8 JSON payload
+//            step: u8 opcode=1, u8 action, u8 fire
+//      batch step: u8 opcode=2, u16 count, count x (u8 action, u8 fire)
+//   response JSON: u8 opcode=0, u32 length, UTF-8 JSON payload
+//            step: u8 opcode=1, f32 reward, u8 done, u8 winner, f32[36] obs,
+//                  followed on terminal steps by u32 length + JSON info
+//      batch step: one step frame per env, in env order
+// All multi-byte values are little-endian.
+//
+// A binary bridge hosts several environments. JSON commands address one of
+// them with an optional "index" field (default 0); a single-step frame always
+// targets env 0, and a batch-step frame advances envs 0..count-1 in order.
+
+export const BRIDGE_OP_JSON = 0;
+export const BRIDGE_OP_STEP = 1;
+export const BRIDGE_OP_STEP_BATCH = 2;
+
+/** Winner codes carried in the step frame header (0 = episode still running). */
+export const WINNER_CODES = {
+  agent: 1,
+  opponent: 2,
+  draw_mutual: 3,
+  timeout: 4,
+};
+
+const JSON_HEADER_SIZE = 5;
+const STEP_COMMAND_SIZE = 3;
+const BATCH_HEADER_SIZE = 3;
+const STEP_HEADER_SIZE = 7;
+const MAX_BRIDGE_ENVS = 0xffff;
+export const STEP_FRAME_SIZE = STEP_HEADER_SIZE + OBSERVATION_SIZE * 4;
+
+/**
+ * Encode a JSON response as a length-prefixed binary frame.
+ * @param {object} response
+ * @returns {Buffer}
+ */
+export function encodeJsonFrame(response) {
+  const payload = Buffer.from(JSON.stringify(response), 'utf8');
+  const frame = Buffer.allocUnsafe(JSON_HEADER_SIZE + payload.length);
+  frame.writeUInt8(BRIDGE_OP_JSON, 0);
+  frame.writeUInt32LE(payload.length, 1);
+  payload.copy(frame, JSON_HEADER_SIZE);
+  return frame;
+}
+
+/**
+ * Encode a step result as a fixed-layout binary frame. Terminal steps carry
+ * the full info object as a length-prefixed JSON trailer; non-terminal steps
+ * carry only the header and observation.
+ *
+ * @param {{ observation: Float32Array, reward: number, done: boolean, info: object }} result
+ * @returns {Buffer}
+ */
+export function encodeStepFrame(result) {
+  const trailer = result.done
+    ? Buffer.from(JSON.stringify(result.info), 'utf8')
+    : null;
+  const size = STEP_FRAME_SIZE + (trailer ? 4 + trailer.length : 0);
+  const frame = Buffer.allocUnsafe(size);
+  frame.writeUInt8(BRIDGE_OP_STEP, 0);
+  frame.writeFloatLE(result.reward, 1);
+  frame.writeUInt8(result.done ? 1 : 0, 5);
+  frame.writeUInt8(WINNER_CODES[result.info.winner] ?? 0, 6);
+  for (let i = 0; i < OBSERVATION_SIZE; i++) {
+    frame.writeFloatLE(result.observation[i], STEP_HEADER_SIZE + i * 4);
+  }
+  if (trailer) {
+    frame.writeUInt32LE(trailer.length, STEP_FRAME_SIZE);
+    trailer.copy(frame, STEP_FRAME_SIZE + 4);
+  }
+  return frame;
+}
+
+/**
+ * Read one command frame from the front of a buffer.
+ *
+ * @param {Buffer} buf - bytes received so far
+ * @returns {{ frame: object, size: number }|null} decoded frame and the number
+ *   of bytes it occupies, or null if the buffer holds an incomplete frame
+ */
+export function readCommandFrame(buf) {
+  if (buf.length < 1) return null;
+  const opcode = buf.readUInt8(0);
+  if (opcode === BRIDGE_OP_STEP) {
+    if (buf.length < STEP_COMMAND_SIZE) return null;
+    return {
+      frame: { opcode, action: buf.readUInt8(1), fire: buf.readUInt8(2) },
+      size: STEP_COMMAND_SIZE,
+    };
+  }
+  if (opcode === BRIDGE_OP_STEP_BATCH) {
+    if (buf.length < BATCH_HEADER_SIZE) return null;
+    const size = BATCH_HEADER_SIZE + buf.readUInt16LE(1) * 2;
+    if (buf.length < size) return null;
+    return {
+      frame: {
+        opcode,
+        actions: Uint8Array.from(buf.subarray(BATCH_HEADER_SIZE, size)),
+      },
+      size,
+    };
+  }
+  if (opcode !== BRIDGE_OP_JSON) {
+    return { frame: { opcode }, size: 1 };
+  }
+  if (buf.length < JSON_HEADER_SIZE) return null;
+  const size = JSON_HEADER_SIZE + buf.readUInt32LE(1);
+  if (buf.length < size) return null;
+  return {
+    frame: { opcode, line: buf.toString('utf8', JSON_HEADER_SIZE, size) },
+    size,
+  };
+}
+
+/**
+ * Check that a step can be applied without advancing the environment.
+ *
+ * @param {GameEnv|null} env - current environment (null if not yet reset)
+ * @param {number} action - movement action index
+ * @param {number} fire - fire action (0 or 1)
+ * @returns {string|null} error message, or null if the step is valid
+ */
+function checkStep(env, action, fire) {
+  if (env === null) {
+    return 'Environment not initialized. Call reset first.';
+  }
+  if (action >= ACTION_MAP.length) {
+    return `Invalid action: moveAction ${action} is not in 0–${ACTION_MAP.length - 1}.`;
+  }
+  if (fire > 1) {
+    return `Invalid action: fireAction ${fire} is not 0 or 1.`;
+  }
+  return null;
+}
+
+/**
+ * Advance envs 0..n-1 by one step each, n = actions.length / 2.
+ * Every (env, action) pair is checked before any env is stepped, so a bad
+ * pair fails the whole batch without advancing the others and the caller
+ * stays in sync.
+ *
+ * @param {Array<GameEnv|null>} envs
+ * @param {Uint8Array} actions - interleaved (action, fire) pairs
+ * @returns {{ frames?: Buffer[], error?: string }}
+ */
+function stepBatch(envs, actions) {
+  const count = actions.length / 2;
+  for (let i = 0; i < count; i++) {
+    const env = envs[i] ?? null;
+    const error = checkStep(env, actions[2 * i], actions[2 * i + 1]);
+    if (error) {
+      return { error: `env ${i}: ${error}` };
+    }
+  }
+  const frames = [];
+  for (let i = 0; i < count; i++) {
+    const env = envs[i] ?? null;
+    const { result, error } = stepEnv(env, actions[2 * i], actions[2 * i + 1]);
+    if (error) {
+      return { error: `env ${i}: ${error}` };
+    }
+    frames.push(encodeStepFrame(result));
+  }
+  return { frames };
+}
+
+/**
+ * Process a single binary command frame for the Python bridge.
+ * JSON frames are dispatched to the env selected by their "index" field;
+ * step frames are answered with binary step frames, or a JSON error frame on
+ * failure.
+ *
+ * @param {Array<GameEnv|null>} envs - environments by index (unset = null)
+ * @param {object} frame - frame decoded by readCommandFrame
+ * @returns {{ response: Buffer, shouldExit: boolean, envs: Array<GameEnv|null> }}
+ */
+export function processBinaryCommand(envs, frame) {
+  const fail = (error) => ({
+    response: encodeJsonFrame({ error }),
+    shouldExit: false,
+    envs,
+  });
+
+  if (frame.opcode === BRIDGE_OP_STEP) {
+    const env = envs[0] ?? null;
+    const { result, error } = stepEnv(env, frame.action, frame.fire);
+    if (error) return fail(error);
+    return { response: encodeStepFrame(result), shouldExit: false, envs };
+  }
+  if (frame.opcode === BRIDGE_OP_STEP_BATCH) {
+    const { frames, error } = stepBatch(envs, frame.actions);
+    if (error) return fail(error);
+    return { response: Buffer.concat(frames), shouldExit: false, envs };
+  }
+  if (frame.opcode !== BRIDGE_OP_JSON) {
+    return fail(`Unknown opcode: ${frame.opcode}`);
+  }
+
+  let parsed;
+  try {
+    parsed = JSON.parse(frame.line);
+  } catch (err) {
+    return fail(`Invalid JSON: ${err.message}`);
+  }
+  const index = parsed.index ?? 0;
+  if (!Number.isInteger(index) || index < 0 || index >= MAX_BRIDGE_ENVS) {
+    return fail(`Invalid env index: ${JSON.stringify(parsed.index)}`);
+  }
+
+  const env = envs[index] ?? null;
+  const result = dispatchCommand(env, parsed);
+  let nextEnvs = envs;
+  if (result.env !== env) {
+    nextEnvs = envs.slice();
+    nextEnvs[index] = result.env;
+  }
+  return {
+    response: encodeJsonFrame(result.response),
+    shouldExit: result.shouldExit,
+    envs: nextEnvs,
+  };
+}
+
+/**
+ * Run the binary bridge I/O loop: read framed commands from stdin, write
+ * framed responses to stdout.
+ */
+async function runBinaryBridge() {
+  let envs = [];
+  let pending = Buffer.alloc(0);
+  for await (const chunk of process.stdin) {
+    pending = pending.length === 0 ? chunk : Buffer.concat([pending, chunk]);
+    let decoded = readCommandFrame(pending);
+    while (decoded !== null) {
+      pending = pending.subarray(decoded.size);
+      const result = processBinaryCommand(envs, decoded.frame);
+      envs = result.envs;
+      process.stdout.write(result.response);
+      if (result.shouldExit) {
+        process.exit(0);
+      }
+      decoded = readCommandFrame(pending);
+    }
+  }
+  process.exit(0);
+}
+
 // ── Main Entry Point ────────────────────────────────────────────────────
 
 const isMain =
@@ -773,7 +1047,8 @@ if (isMain) {
       // onnxruntime-node not installed — self-play strategy unavailable
     }
 
-    runBridge().catch((err) => {
+    const bridge = config.bridgeBinary ? runBinaryBridge : runBridge;
+    bridge().catch((err) => {
       process.stderr.write(`Bridge error: ${err.message}\n`);
       process.exit(1);
     });
@@ -1,6 +1,46 @@
 import { execSync } from 'node:child_process';
 import { describe, expect, it } from 'vitest';
-import { parseArgs, processCommand } from '../simulate.js';
+import {
+  BRIDGE_OP_JSON,
+  BRIDGE_OP_STEP,
+  BRIDGE_OP_STEP_BATCH,
+  encodeJsonFrame,
+  encodeStepFrame,
+  parseArgs,
+  processBinaryCommand,
+  processCommand,
+  readCommandFrame,
+  STEP_FRAME_SIZE,
+  WINNER_CODES,
+} from '../simulate.js';
+
+function jsonCommandFrame(cmd) {
+  const payload = Buffer.from(JSON.stringify(cmd), 'utf8');
+  const header = Buffer.alloc(5);
+  header.writeUInt8(BRIDGE_OP_JSON, 0);
+  header.writeUInt32LE(payload.length, 1);
+  return Buffer.concat([header, payload]);
+}
+
+function stepCommandFrame(action, fire) {
+  return Buffer.from([BRIDGE_OP_STEP, action, fire]);
+}
+
+function batchStepCommandFrame(actions) {
+  const header = Buffer.alloc(3);
+  header.writeUInt8(BRIDGE_OP_STEP_BATCH, 0);
+  header.writeUInt16LE(actions.length / 2, 1);
+  return Buffer.concat([header, Buffer.from(actions)]);
+}
+
+function readJsonFrame(buf, offset) {
+  const length = buf.readUInt32LE(offset + 1);
+  const start = offset + 5;
+  return {
+    response: JSON.parse(buf.toString('utf8', start, start + length)),
+    next: start + length,
+  };
+}
 
 // ── Unit Tests: processCommand ──────────────────────────────────────────
 
@@ -205,6 +245,261 @@ describe('Increment 34: Python Bridge', () => {
     it('defaults bridge to false', () => {
       expect(parseArgs([]).bridge).toBe(false);
     });
+
+    it('--bridge-binary sets bridge and bridgeBinary to true', () => {
+      const config = parseArgs(['--bridge-binary']);
+      expect(config.bridge).toBe(true);
+      expect(config.bridgeBinary).toBe(true);
+    });
+
+    it('--bridge leaves bridgeBinary false', () => {
+      expect(parseArgs(['--bridge']).bridgeBinary).toBe(false);
+    });
+  });
+
+  // ── Unit Tests: binary framing ────────────────────────────────────────
+
+  describe('readCommandFrame', () => {
+    it('decodes a step command', () => {
+      const decoded = readCommandFrame(stepCommandFrame(7, 1));
+      expect(decoded.size).toBe(3);
+      expect(decoded.frame).toEqual({
+        opcode: BRIDGE_OP_STEP,
+        action: 7,
+        fire: 1,
+      });
+    });
+
+    it('decodes a JSON command', () => {
+      const buf = jsonCommandFrame({ command: 'reset' });
+      const decoded = readCommandFrame(buf);
+      expect(decoded.size).toBe(buf.length);
+      expect(decoded.frame.opcode).toBe(BRIDGE_OP_JSON);
+      expect(JSON.parse(decoded.frame.line)).toEqual({ command: 'reset' });
+    });
+
+    it('returns null for incomplete frames', () => {
+      const buf = jsonCommandFrame({ command: 'reset' });
+      expect(readCommandFrame(Buffer.alloc(0))).toBeNull();
+      expect(readCommandFrame(buf.subarray(0, 3))).toBeNull();
+      expect(readCommandFrame(buf.subarray(0, buf.length - 1))).toBeNull();
+      const step = stepCommandFrame(0, 0);
+      expect(readCommandFrame(step.subarray(0, 2))).toBeNull();
+    });
+
+    it('decodes only the first of several concatenated frames', () => {
+      const first = jsonCommandFrame({ command: 'reset' });
+      const buf = Buffer.concat([first, stepCommandFrame(2, 0)]);
+      const decoded = readCommandFrame(buf);
+      expect(decoded.size).toBe(first.length);
+      expect(readCommandFrame(buf.subarray(decoded.size)).frame.action).toBe(2);
+    });
+
+    it('decodes a batch step command', () => {
+      const buf = batchStepCommandFrame([3, 1, 9, 0]);
+      const decoded = readCommandFrame(buf);
+      expect(decoded.size).toBe(7);
+      expect(decoded.frame.opcode).toBe(BRIDGE_OP_STEP_BATCH);
+      expect(Array.from(decoded.frame.actions)).toEqual([3, 1, 9, 0]);
+      expect(readCommandFrame(buf.subarray(0, 2))).toBeNull();
+      expect(readCommandFrame(buf.subarray(0, 6))).toBeNull();
+    });
+  });
+
+  describe('encodeStepFrame', () => {
+    const observation = Float32Array.from({ length: 36 }, (_, i) => i / 36);
+
+    it('non-terminal frame has fixed size and no trailer', () => {
+      const frame = encodeStepFrame({
+        observation,
+        reward: 0.25,
+        done: false,
+        info: { winner: null },
+      });
+      expect(frame).toHaveLength(STEP_FRAME_SIZE);
+      expect(frame.readUInt8(0)).toBe(BRIDGE_OP_STEP);
+      expect(frame.readFloatLE(1)).toBeCloseTo(0.25);
+      expect(frame.readUInt8(5)).toBe(0);
+      expect(frame.readUInt8(6)).toBe(0);
+    });
+
+    it('packs observation as little-endian float32 after header', () => {
+      const frame = encodeStepFrame({
+        observation,
+        reward: 0,
+        done: false,
+        info: { winner: null },
+      });
+      for (let i = 0; i < 36; i++) {
+        expect(frame.readFloatLE(7 + i * 4)).toBe(observation[i]);
+      }
+    });
+
+    it('terminal frame carries winner code and JSON info trailer', () => {
+      const info = { winner: 'timeout', ticksElapsed: 10 };
+      const frame = encodeStepFrame({
+        observation,
+        reward: -1,
+        done: true,
+        info,
+      });
+      expect(frame.readUInt8(5)).toBe(1);
+      expect(frame.readUInt8(6)).toBe(WINNER_CODES.timeout);
+      const length = frame.readUInt32LE(STEP_FRAME_SIZE);
+      expect(frame).toHaveLength(STEP_FRAME_SIZE + 4 + length);
+      const trailer = frame.toString('utf8', STEP_FRAME_SIZE + 4);
+      expect(JSON.parse(trailer)).toEqual(info);
+    });
+  });
+
+  describe('encodeJsonFrame', () => {
+    it('length-prefixes the JSON payload', () => {
+      const frame = encodeJsonFrame({ status: 'closed' });
+      expect(frame.readUInt8(0)).toBe(BRIDGE_OP_JSON);
+      expect(frame.readUInt32LE(1)).toBe(frame.length - 5);
+      expect(JSON.parse(frame.toString('utf8', 5))).toEqual({
+        status: 'closed',
+      });
+    });
+  });
+
+  describe('processBinaryCommand', () => {
+    function decode(buf) {
+      return readCommandFrame(buf).frame;
+    }
+
+    function resetFrame(index) {
+      return decode(jsonCommandFrame({ command: 'reset', index }));
+    }
+
+    function jsonError(result) {
+      expect(result.response.readUInt8(0)).toBe(BRIDGE_OP_JSON);
+      return JSON.parse(result.response.toString('utf8', 5)).error;
+    }
+
+    it('reset returns a JSON frame and a new env', () => {
+      const result = processBinaryCommand(
+        [],
+        decode(jsonCommandFrame({ command: 'reset' })),
+      );
+      expect(result.envs[0]).toBeDefined();
+      expect(result.envs[0]).not.toBeNull();
+      expect(result.response.readUInt8(0)).toBe(BRIDGE_OP_JSON);
+      const response = JSON.parse(result.response.toString('utf8', 5));
+      expect(response.observation).toHaveLength(36);
+    });
+
+    it('reset with index fills that slot without touching others', () => {
+      const first = processBinaryCommand([], resetFrame(0));
+      const second = processBinaryCommand(first.envs, resetFrame(2));
+      expect(second.envs[0]).toBe(first.envs[0]);
+      expect(second.envs[2]).not.toBeNull();
+      expect(second.envs[2]).not.toBe(first.envs[0]);
+      expect(first.envs).toHaveLength(1);
+    });
+
+    it('rejects an invalid env index', () => {
+      const result = processBinaryCommand([], resetFrame(-1));
+      expect(jsonError(result)).toBe('Invalid env index: -1');
+      expect(result.envs).toEqual([]);
+    });
+
+    it('invalid JSON returns a JSON error frame', () => {
+      const payload = Buffer.from('nope', 'utf8');
+      const header = Buffer.from([BRIDGE_OP_JSON, payload.length, 0, 0, 0]);
+      const frame = decode(Buffer.concat([header, payload]));
+      const result = processBinaryCommand([], frame);
+      expect(jsonError(result)).toMatch(/^Invalid JSON:/);
+    });
+
+    it('step returns a binary step frame', () => {
+      const { envs } = processBinaryCommand([], resetFrame(0));
+      const result = processBinaryCommand(envs, decode(stepCommandFrame(3, 1)));
+      expect(result.response.readUInt8(0)).toBe(BRIDGE_OP_STEP);
+      expect(result.response.length).toBeGreaterThanOrEqual(STEP_FRAME_SIZE);
+      expect(result.shouldExit).toBe(false);
+    });
+
+    it('step before reset returns a JSON error frame', () => {
+      const result = processBinaryCommand([], decode(stepCommandFrame(0, 0)));
+      expect(jsonError(result)).toBe(
+        'Environment not initialized. Call reset first.',
+      );
+    });
+
+    it('invalid action returns a JSON error frame', () => {
+      const { envs } = processBinaryCommand([], resetFrame(0));
+      const result = processBinaryCommand(
+        envs,
+        decode(stepCommandFrame(99, 0)),
+      );
+      expect(jsonError(result)).toMatch(/^Invalid action:/);
+    });
+
+    it('batch step returns one step frame per env, in order', () => {
+      let envs = [];
+      for (let i = 0; i < 3; i++) {
+        envs = processBinaryCommand(envs, resetFrame(i)).envs;
+      }
+      const frame = decode(batchStepCommandFrame([3, 1, 0, 0, 7, 1]));
+      const result = processBinaryCommand(envs, frame);
+      const { response } = result;
+      let offset = 0;
+      for (let i = 0; i < 3; i++) {
+        expect(response.readUInt8(offset)).toBe(BRIDGE_OP_STEP);
+        expect(response.readUInt8(offset + 5)).toBe(0);
+        offset += STEP_FRAME_SIZE;
+      }
+      expect(response).toHaveLength(offset);
+      expect(result.envs).toBe(envs);
+    });
+
+    it('batch step reports the failing env', () => {
+      const { envs } = processBinaryCommand([], resetFrame(0));
+      const frame = decode(batchStepCommandFrame([0, 0, 0, 0]));
+      const error = jsonError(processBinaryCommand(envs, frame));
+      expect(error).toBe(
+        'env 1: Environment not initialized. Call reset first.',
+      );
+    });
+
+    it('batch step with an invalid action does not advance earlier envs', () => {
+      let envs = [];
+      for (let i = 0; i < 2; i++) {
+        envs = processBinaryCommand(
+          envs,
+          decode(
+            jsonCommandFrame({
+              command: 'reset',
+              index: i,
+              config: { maxTicks: 2 },
+            }),
+          ),
+        ).envs;
+      }
+      const bad = decode(batchStepCommandFrame([0, 0, 99, 0]));
+      expect(jsonError(processBinaryCommand(envs, bad))).toMatch(
+        /^env 1: Invalid action:/,
+      );
+
+      // Env 0 is still on its first tick, so two more steps end the episode
+      const step = decode(stepCommandFrame(0, 0));
+      expect(processBinaryCommand(envs, step).response.readUInt8(5)).toBe(0);
+      expect(processBinaryCommand(envs, step).response.readUInt8(5)).toBe(1);
+    });
+
+    it('unknown opcode returns a JSON error frame', () => {
+      const result = processBinaryCommand([], decode(Buffer.from([9])));
+      expect(jsonError(result)).toBe('Unknown opcode: 9');
+    });
+
+    it('close sets shouldExit', () => {
+      const result = processBinaryCommand(
+        [],
+        decode(jsonCommandFrame({ command: 'close' })),
+      );
+      expect(result.shouldExit).toBe(true);
+    });
   });
 
   // ── Integration Tests: process spawn ──────────────────────────────────
@@ -268,6 +563,52 @@ describe('Increment 34: Python Bridge', () => {
       }
     });
 
+    it('binary reset + step + close round-trip', () => {
+      const input = Buffer.concat([
+        jsonCommandFrame({ command: 'reset', config: {} }),
+        stepCommandFrame(0, 0),
+        jsonCommandFrame({ command: 'close' }),
+      ]);
+
+      const output = execSync('node simulate.js --bridge-binary', {
+        input,
+        timeout: 10000,
+      });
+
+      const reset = readJsonFrame(output, 0);
+      expect(reset.response.observation).toHaveLength(36);
+
+      expect(output.readUInt8(reset.next)).toBe(BRIDGE_OP_STEP);
+      const close = readJsonFrame(output, reset.next + STEP_FRAME_SIZE);
+      expect(close.response).toEqual({ status: 'closed' });
+      expect(close.next).toBe(output.length);
+    });
+
+    it('binary batched reset + step round-trip', () => {
+      const input = Buffer.concat([
+        jsonCommandFrame({ command: 'reset', index: 0 }),
+        jsonCommandFrame({ command: 'reset', index: 1 }),
+        batchStepCommandFrame([0, 0, 4, 1]),
+        jsonCommandFrame({ command: 'close' }),
+      ]);
+
+      const output = execSync('node simulate.js --bridge-binary', {
+        input,
+        timeout: 10000,
+      });
+
+      const first = readJsonFrame(output, 0);
+      const second = readJsonFrame(output, first.next);
+      expect(second.response.observation).toHaveLength(36);
+      expect(output.readUInt8(second.next)).toBe(BRIDGE_OP_STEP);
+      const stepEnd = second.next + 2 * STEP_FRAME_SIZE;
+      expect(output.readUInt8(second.next + STEP_FRAME_SIZE)).toBe(
+        BRIDGE_OP_STEP,
+      );
+      const close = readJsonFrame(output, stepEnd);
+      expect(close.response).toEqual({ status: 'closed' });
+    });
+
     it('process exits with code 0 on close', () => {
       const input = [
         JSON.stringify({ command: 'reset', config: {} }),
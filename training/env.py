@@ -1,37 +1,77 @@
-"""Gymnasium wrapper that drives the Node.js game bridge via stdin/stdout JSON-lines."""
+"""Gymnasium wrapper that drives the Node.js game bridge via stdin/stdout.
+
+Two wire protocols are supported:
+
+- ``"binary"`` (default): ``node simulate.js --bridge-binary``.  Step commands
+  and responses are fixed-layout structs; only reset/close (and errors) are
+  JSON, wrapped in a length-prefixed frame.  One binary bridge can host many
+  games, which ``vec_env.BatchedSpaceDogfightVecEnv`` steps with a single
+  batch command.
+- ``"json"``: ``node simulate.js --bridge``, one JSON object per line.
+
+JSON payloads are encoded with ``orjson`` when it is installed and with the
+standard library otherwise.
+"""
 
 import json
 import os
+import struct
 import subprocess
 import sys
 
 import gymnasium
 import numpy as np
 
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used when orjson is absent
+    orjson = None
+
 
 # Observation vector length (must match src/observation.js OBSERVATION_SIZE).
 OBSERVATION_SIZE = 36
 
+# Binary bridge framing (must match simulate.js, "Binary Bridge").
+OP_JSON = 0
+OP_STEP = 1
+_CMD_FMT = struct.Struct("<BBB")  # opcode, move action, fire action
+_JSON_HEADER = struct.Struct("<BI")  # opcode, payload length
+_STEP_HEADER = struct.Struct("<Bf?B")  # opcode, reward, done, winner code
+_STEP_FMT = struct.Struct(f"<Bf?B{OBSERVATION_SIZE}f")  # header + observation
+_TRAILER_LEN = struct.Struct("<I")  # JSON info length on terminal steps
+_WINNER_TIMEOUT = 4
 
-class SpaceDogfightEnv(gymnasium.Env):
-    """Gymnasium environment that communicates with ``node simulate.js --bridge``.
+# Buffer size for the bridge's stdin/stdout pipes.
+_PIPE_BUFFER_SIZE = 64 * 1024
 
-    The Node.js process is spawned lazily on the first ``reset()`` call so that
-    the environment object is picklable (required by ``SubprocVecEnv``).  If the
-    subprocess crashes, the next ``reset()`` will restart it automatically.
-    """
+# Batch step command header: opcode, env count; followed by (move, fire) pairs.
+OP_STEP_BATCH = 2
+BATCH_HEADER = struct.Struct("<BH")
 
-    metadata = {"render_modes": []}
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
 
-    def __init__(self, stage_config=None, node_executable="node", simulate_path=None):
-        super().__init__()
+    _json_loads = json.loads
 
-        self.observation_space = gymnasium.spaces.Box(
-            low=-1.0, high=1.0, shape=(OBSERVATION_SIZE,), dtype=np.float32
-        )
-        self.action_space = gymnasium.spaces.MultiDiscrete([10, 2])
 
-        self._stage_config = stage_config or {}
+class BridgeProcess:
+    """One ``node simulate.js`` bridge subprocess and its wire protocol.
+
+    The process is spawned by ``ensure_running()``.  Any I/O failure kills it
+    and raises ``RuntimeError``; the next ``ensure_running()`` starts a fresh
+    one.  A binary bridge can host several environments (see the "index"
+    field of JSON commands); a JSON-lines bridge hosts exactly one.
+    """
+
+    def __init__(self, node_executable="node", simulate_path=None, protocol="binary"):
+        if protocol not in ("binary", "json"):
+            raise ValueError(f"Unknown bridge protocol: {protocol!r} (expected 'binary' or 'json')")
+
+        self.protocol = protocol
         self._node_executable = node_executable
 
         if simulate_path is None:
@@ -43,59 +83,258 @@ class SpaceDogfightEnv(gymnasium.Env):
         else:
             self._simulate_path = os.path.abspath(simulate_path)
 
+        # Step responses are read straight into this buffer; ``frame_obs`` is
+        # a float32 view over its tail and is overwritten by the next frame.
+        self.frame_buf = bytearray(_STEP_FMT.size)
+        self.frame_obs = np.frombuffer(
+            self.frame_buf, dtype=np.float32, count=OBSERVATION_SIZE, offset=_STEP_HEADER.size
+        )
+
         self._process = None
+        self._close_payload = self.encode_command({"command": "close"})
 
-    # ------------------------------------------------------------------
-    # Subprocess management
-    # ------------------------------------------------------------------
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
 
-    def _ensure_process(self):
+    def ensure_running(self):
         """Spawn the Node.js bridge process if it is not running."""
-        if self._process is not None and self._process.poll() is None:
-            return  # already alive
+        if self.is_running():
+            return
 
         # Kill zombie if it exists
-        if self._process is not None:
-            try:
-                self._process.kill()
-            except OSError:
-                pass
+        self.kill()
 
+        flag = "--bridge-binary" if self.protocol == "binary" else "--bridge"
+        # Both protocols use byte pipes: JSON lines are encoded/decoded by
+        # the json module directly, with no text-mode codec in between.
         self._process = subprocess.Popen(
-            [self._node_executable, self._simulate_path, "--bridge"],
+            [self._node_executable, self._simulate_path, flag],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,  # line-buffered
+            bufsize=_PIPE_BUFFER_SIZE,
         )
 
-    def _send_command(self, cmd):
+    def kill(self):
+        if self._process is not None:
+            try:
+                self._process.kill()
+            except OSError:
+                pass
+            self._process = None
+
+    def encode_command(self, cmd):
+        """Encode a JSON command into the bytes this bridge's protocol expects.
+
+        Commands that never change (a stage's reset, close) can be encoded once
+        and sent repeatedly with ``send_raw()``.
+        """
+        payload = _json_dumps(cmd)
+        if self.protocol == "binary":
+            return _JSON_HEADER.pack(OP_JSON, len(payload)) + payload
+        return payload + b"\n"
+
+    def send_command(self, cmd):
         """Send a JSON command and return the parsed JSON response.
 
-        If the subprocess has died, restart it and raise so the caller
-        can retry (typically on the next ``reset()``).
+        If the subprocess has died, kill it and raise so the caller can retry
+        (typically on the next ``reset()``).
         """
+        return self.send_raw(self.encode_command(cmd))
+
+    def send_raw(self, data):
+        """Send a command already encoded by ``encode_command()``; return the response."""
         try:
-            line = json.dumps(cmd) + "\n"
-            self._process.stdin.write(line)
+            self._process.stdin.write(data)
             self._process.stdin.flush()
-            response_line = self._process.stdout.readline()
-            if not response_line:
-                raise ConnectionError("Bridge process produced no output")
-            return json.loads(response_line)
+            return self._read_response()
         except (BrokenPipeError, ConnectionError, OSError) as exc:
-            # Process died — clean up so _ensure_process will restart it
-            self._kill_process()
+            # Process died — clean up so ensure_running will restart it
+            self.kill()
             raise RuntimeError(f"Bridge subprocess crashed: {exc}") from exc
 
-    def _kill_process(self):
-        if self._process is not None:
+    def send_many(self, payloads):
+        """Pipeline several encoded commands and return their responses in order.
+
+        All commands are written and flushed once before the first response
+        is read, so N commands cost one round trip instead of N.
+        """
+        try:
+            stdin = self._process.stdin
+            for data in payloads:
+                stdin.write(data)
+            stdin.flush()
+            return [self._read_response() for _ in payloads]
+        except (BrokenPipeError, ConnectionError, OSError) as exc:
+            # Process died — clean up so ensure_running will restart it
+            self.kill()
+            raise RuntimeError(f"Bridge subprocess crashed: {exc}") from exc
+
+    def _read_response(self):
+        if self.protocol == "binary":
+            _, response = self._read_frame()
+            return response
+        response_line = self._process.stdout.readline()
+        if not response_line:
+            raise ConnectionError("Bridge process produced no output")
+        return _json_loads(response_line)
+
+    def exchange(self, data):
+        """Write a binary command frame and read back the first response frame.
+
+        Returns ``(opcode, payload)``: for JSON frames *payload* is the decoded
+        response; for step frames the header and observation are left in
+        ``frame_buf`` and *payload* is the info dict (empty unless the episode
+        ended).  A batch step is answered by several step frames; read the
+        rest with ``read_frame()``.
+        """
+        try:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+            return self._read_frame()
+        except (BrokenPipeError, ConnectionError, OSError) as exc:
+            # Process died — clean up so ensure_running will restart it
+            self.kill()
+            raise RuntimeError(f"Bridge subprocess crashed: {exc}") from exc
+
+    def read_frame(self):
+        """Read the next response frame; see ``exchange()`` for the result."""
+        try:
+            return self._read_frame()
+        except (ConnectionError, OSError) as exc:
+            self.kill()
+            raise RuntimeError(f"Bridge subprocess crashed: {exc}") from exc
+
+    def _read_frame(self):
+        view = memoryview(self.frame_buf)
+        # Both frame types start with at least _JSON_HEADER.size bytes.
+        self._read_into(view[:_JSON_HEADER.size])
+        opcode = self.frame_buf[0]
+        if opcode == OP_JSON:
+            _, length = _JSON_HEADER.unpack_from(self.frame_buf)
+            return opcode, _json_loads(self._read_bytes(length))
+
+        self._read_into(view[_JSON_HEADER.size:])
+        info = {}
+        if self.frame_buf[5]:  # done flag
+            (length,) = _TRAILER_LEN.unpack(self._read_bytes(_TRAILER_LEN.size))
+            info = _json_loads(self._read_bytes(length))
+        return opcode, info
+
+    def _read_into(self, view):
+        stdout = self._process.stdout
+        while view:
+            n = stdout.readinto(view)
+            if not n:
+                raise ConnectionError("Bridge process produced no output")
+            view = view[n:]
+
+    def _read_bytes(self, size):
+        buf = bytearray(size)
+        self._read_into(memoryview(buf))
+        return buf
+
+    def close(self):
+        """Ask the bridge to exit, then make sure it is gone."""
+        if self.is_running():
             try:
-                self._process.kill()
-            except OSError:
+                self.send_raw(self._close_payload)
+            except (RuntimeError, OSError):
                 pass
-            self._process = None
+            self.kill()
+
+
+def make_spaces():
+    """Return fresh ``(observation_space, action_space)`` for one game."""
+    observation_space = gymnasium.spaces.Box(
+        low=-1.0, high=1.0, shape=(OBSERVATION_SIZE,), dtype=np.float32
+    )
+    action_space = gymnasium.spaces.MultiDiscrete([10, 2])
+    return observation_space, action_space
+
+
+def unpack_step_header(frame_buf):
+    """Decode a binary step frame header into ``(reward, terminated, truncated)``."""
+    _, reward, done, winner = _STEP_HEADER.unpack_from(frame_buf)
+    truncated = done and winner == _WINNER_TIMEOUT
+    terminated = done and not truncated
+    return reward, terminated, truncated
+
+
+class SpaceDogfightEnv(gymnasium.Env):
+    """Gymnasium environment that communicates with ``node simulate.js --bridge``.
+
+    The Node.js process is spawned lazily on the first ``reset()`` call so that
+    the environment object is picklable (required by ``SubprocVecEnv``).  If the
+    subprocess crashes, the next ``reset()`` will restart it automatically.
+    """
+
+    metadata = {"render_modes": []}
+
+    def __init__(self, stage_config=None, node_executable="node", simulate_path=None,
+                 protocol="binary"):
+        super().__init__()
+
+        self.observation_space, self.action_space = make_spaces()
+
+        self._stage_config = stage_config or {}
+        self._protocol = protocol
+        self._bridge = BridgeProcess(node_executable, simulate_path, protocol)
+        # The reset command only changes with the stage config, so it is
+        # encoded up front rather than on every reset.
+        self._encode_reset()
+        self._shared_obs = None
+        # Binary step command, packed in place on every step.
+        self._step_cmd = bytearray(_CMD_FMT.size)
+        # JSON observations are decoded into this buffer rather than a fresh
+        # array per call.  SB3 copies observations into its own buffers, so
+        # handing out the same array each step is safe.
+        self._obs_buf = np.empty(OBSERVATION_SIZE, dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # Subprocess management
+    # ------------------------------------------------------------------
+
+    def _ensure_process(self):
+        """Spawn the Node.js bridge process if it is not running."""
+        self._bridge.ensure_running()
+
+    def _send_command(self, cmd):
+        """Send a JSON command and return the parsed JSON response."""
+        return self._bridge.send_command(cmd)
+
+    def _encode_reset(self):
+        self._reset_payload = self._bridge.encode_command({
+            "command": "reset",
+            "config": self._stage_config,
+        })
+
+    def set_stage_config(self, stage_config):
+        """Use *stage_config* from the next ``reset()`` on.
+
+        The Node.js process keeps running; the simulator takes its config
+        from each reset command.
+        """
+        self._stage_config = stage_config or {}
+        self._encode_reset()
+
+    def set_shared_obs_buffer(self, shm_array, index):
+        """Publish observations into row *index* of a shared ``(n_envs, 36)`` array.
+
+        Used by ``ShmemVecEnv`` workers: once set, ``reset()`` and
+        non-terminal ``step()`` calls write the observation into the shared
+        row and return that row, so the parent process can read it without
+        the observation being pickled through a pipe.  Returns that row.
+        """
+        self._shared_obs = shm_array[index]
+        self._obs_buf = self._shared_obs
+        return self._shared_obs
+
+    def _publish_obs(self, obs):
+        if self._shared_obs is None:
+            return obs
+        self._shared_obs[:] = obs
+        return self._shared_obs
 
     # ------------------------------------------------------------------
     # Gymnasium interface
@@ -105,21 +344,21 @@ class SpaceDogfightEnv(gymnasium.Env):
         super().reset(seed=seed)
         self._ensure_process()
 
-        response = self._send_command({
-            "command": "reset",
-            "config": self._stage_config,
-        })
+        response = self._bridge.send_raw(self._reset_payload)
 
         if "error" in response:
             raise RuntimeError(f"Bridge reset error: {response['error']}")
 
-        obs = np.array(response["observation"], dtype=np.float32)
-        return obs, {}
+        self._obs_buf[:] = response["observation"]
+        return self._obs_buf, {}
 
     def step(self, action):
         move_action = int(action[0])
         fire_action = int(action[1])
 
+        if self._protocol == "binary":
+            return self._step_binary(move_action, fire_action)
+
         response = self._send_command({
             "command": "step",
             "action": move_action,
@@ -129,39 +368,76 @@ class SpaceDogfightEnv(gymnasium.Env):
         if "error" in response:
             raise RuntimeError(f"Bridge step error: {response['error']}")
 
-        obs = np.array(response["observation"], dtype=np.float32)
-        reward = float(response["reward"])
-        done = bool(response["done"])
-        info = response.get("info", {})
+        obs = self._obs_buf
+        obs[:] = response["observation"]
+        # The bridge schema already gives a JSON number and boolean, so no
+        # casts: SB3 stores rewards in a float32 array either way.  (A zero
+        # reward arrives as int 0, since JSON.stringify(0) is "0".)
+        reward = response["reward"]
+        done = response["done"]
+        info = response["info"]
+        if __debug__:
+            assert isinstance(reward, (int, float)) and isinstance(done, bool), response
+
+        # Gymnasium API: terminated vs truncated.  The winner only matters on
+        # the last step of an episode, so non-terminal steps skip the lookup.
+        terminated = truncated = False
+        if done:
+            truncated = info.get("winner") == "timeout"
+            terminated = not truncated
+            # Stashed by the VecEnv across the following reset(); see below.
+            obs = obs.copy()
+        return obs, reward, terminated, truncated, info
+
+    def _step_binary(self, move_action, fire_action):
+        _CMD_FMT.pack_into(self._step_cmd, 0, OP_STEP, move_action, fire_action)
+        opcode, info = self._bridge.exchange(self._step_cmd)
+        if opcode == OP_JSON:
+            raise RuntimeError(f"Bridge step error: {info.get('error', info)}")
 
-        # Gymnasium API: terminated vs truncated
-        terminated = done and info.get("winner") != "timeout"
-        truncated = done and info.get("winner") == "timeout"
+        reward, terminated, truncated = unpack_step_header(self._bridge.frame_buf)
 
+        # The observation is a view that the next step overwrites.  SB3 copies
+        # it into its own buffers, but a terminal observation is stashed in
+        # info by the VecEnv across the following reset(), so hand out a copy.
+        frame_obs = self._bridge.frame_obs
+        if terminated or truncated:
+            obs = frame_obs.copy()
+        else:
+            obs = self._publish_obs(frame_obs)
         return obs, reward, terminated, truncated, info
 
     def close(self):
-        if self._process is not None and self._process.poll() is None:
-            try:
-                self._send_command({"command": "close"})
-            except (RuntimeError, OSError):
-                pass
-            self._kill_process()
+        self._bridge.close()
 
 
-def make_env(stage_config, rank, node_executable="node", simulate_path=None):
-    """Factory function for ``SubprocVecEnv``.
+class _EnvFactory:
+    """Picklable zero-argument constructor for ``SpaceDogfightEnv``.
 
-    Returns a callable that creates a ``SpaceDogfightEnv`` with the given
-    config.  Each env gets a unique seed derived from *rank*.
+    A module-level class rather than a closure, so sending it to a worker
+    process pickles a reference to this module plus a few plain arguments.
     """
 
-    def _init():
-        env = SpaceDogfightEnv(
-            stage_config=stage_config,
-            node_executable=node_executable,
-            simulate_path=simulate_path,
+    def __init__(self, stage_config, node_executable, simulate_path, protocol):
+        self.stage_config = stage_config
+        self.node_executable = node_executable
+        self.simulate_path = simulate_path
+        self.protocol = protocol
+
+    def __call__(self):
+        return SpaceDogfightEnv(
+            stage_config=self.stage_config,
+            node_executable=self.node_executable,
+            simulate_path=self.simulate_path,
+            protocol=self.protocol,
         )
-        return env
 
-    return _init
+
+def make_env(stage_config, node_executable="node", simulate_path=None, protocol="binary"):
+    """Factory function for ``SubprocVecEnv``.
+
+    Returns a callable that creates a ``SpaceDogfightEnv`` with the given
+    config.  Envs are not seeded: the Node.js bridge draws from its own
+    unseeded ``Math.random``.
+    """
+    return _EnvFactory(stage_config, node_executable, simulate_path, protocol)
@@ -10,11 +10,14 @@ Browser inference (ai-neural.js) splits these as:
 Usage:
     python training/export_onnx.py --checkpoint training/checkpoints/stage1/final.zip
     python training/export_onnx.py --checkpoint path/to/model.zip --output models/policy.onnx
+    python training/export_onnx.py --checkpoint path/to/model.zip --precision fp16
 """
 
 import argparse
+import io
 import os
 import sys
+import tempfile
 
 # Prevent Unicode crashes on Windows consoles (cp1252) when PyTorch's ONNX
 # exporter prints emoji like checkmarks.
@@ -34,25 +37,153 @@ OUTPUT_SIZE = 12  # 10 movement + 2 fire
 class PolicyWrapper(nn.Module):
     """Wraps the SB3 policy network into a single forward pass module.
 
-    Takes raw observation, runs through features_extractor and mlp_extractor,
-    then through the action_net to produce 12 logits (10 movement + 2 fire).
+    The actor path is rebuilt as one flat ``nn.Sequential``: features_extractor,
+    then ``mlp_extractor.policy_net``, then action_net, producing 12 logits
+    (10 movement + 2 fire).  The value network is never traced, so none of
+    its layers end up in the exported graph.
     """
 
     def __init__(self, policy):
         super().__init__()
-        self.features_extractor = policy.features_extractor
-        self.mlp_extractor = policy.mlp_extractor
-        self.action_net = policy.action_net
+        self.net = nn.Sequential(
+            policy.features_extractor,
+            policy.mlp_extractor.policy_net,
+            policy.action_net,
+        )
 
     def forward(self, obs):
-        features = self.features_extractor(obs)
-        latent_pi, _ = self.mlp_extractor(features)
-        logits = self.action_net(latent_pi)
-        return logits
+        return self.net(obs)
+
+
+def _run_rows(session, observations):
+    """Run *session* on each observation row separately (works for static batch=1)."""
+    return np.concatenate([
+        session.run(None, {"observation": observations[i:i + 1]})[0]
+        for i in range(len(observations))
+    ])
+
+
+def _cpu_session(model, optimized_model_filepath=None, level="ORT_ENABLE_ALL"):
+    """Create a CPU-only onnxruntime session straight from an in-memory ModelProto.
+
+    Graph optimizations run at *level* with memory-pattern planning enabled;
+    if *optimized_model_filepath* is given, ORT writes the optimized graph there.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, level)
+    options.enable_mem_pattern = True
+    if optimized_model_filepath is not None:
+        options.optimized_model_filepath = optimized_model_filepath
+    return ort.InferenceSession(model.SerializeToString(), options,
+                                providers=["CPUExecutionProvider"])
+
 
+def _same_logits(model, candidate, num_checks, atol):
+    sample_obs = np.random.uniform(-1, 1, (num_checks, OBSERVATION_SIZE)).astype(np.float32)
+    before, after = (_run_rows(_cpu_session(m), sample_obs) for m in (model, candidate))
+    return np.allclose(before, after, atol=atol)
 
-def export_onnx(checkpoint_path, output_path, validate=True):
-    """Load an SB3 PPO model and export its policy to ONNX."""
+
+def simplify_model(model, num_checks=100):
+    """Simplify an in-memory ModelProto with onnxsim and return the result.
+
+    onnxsim folds constants and drops redundant nodes (e.g. the Flatten the
+    exporter emits in front of the first Gemm).  The simplified graph is only
+    returned if its logits match the original on *num_checks* random
+    observations; otherwise, or when onnxsim is not installed, *model* is
+    returned unchanged.
+    """
+    try:
+        import onnxsim
+    except ImportError:
+        print("onnxsim not installed; skipping graph simplification")
+        return model
+
+    simplified, ok = onnxsim.simplify(model)
+    if not ok:
+        print("WARNING: onnxsim could not validate the simplified graph; keeping the original")
+        return model
+
+    if not _same_logits(model, simplified, num_checks, atol=1e-5):
+        print("WARNING: simplified graph changes the logits; keeping the original")
+        return model
+
+    print(f"Simplified graph: {len(model.graph.node)} -> {len(simplified.graph.node)} nodes")
+    return simplified
+
+
+def ort_optimize_model(model, num_checks=100):
+    """Bake onnxruntime's extended graph optimizations into *model*.
+
+    Lets ORT fuse e.g. Gemm+Relu into ``com.microsoft.FusedGemm`` once at
+    export time instead of on every session creation in the browser.  The
+    extended level is used because ``ORT_ENABLE_ALL`` adds layout transforms
+    tied to the exporting machine.  The optimized graph is returned only if
+    ORT accepts it, its logits match and it has fewer nodes; otherwise
+    *model* is returned.
+    """
+    import onnx
+
+    with tempfile.TemporaryDirectory() as tmp:
+        optimized_path = os.path.join(tmp, "model.opt.onnx")
+        try:
+            _cpu_session(model, optimized_path, level="ORT_ENABLE_EXTENDED")
+            optimized = onnx.load(optimized_path)
+            same = _same_logits(model, optimized, num_checks, atol=1e-4)
+        except Exception as exc:  # noqa: BLE001 - any ORT failure means "keep the original"
+            print(f"WARNING: onnxruntime graph optimization failed ({exc}); keeping the original")
+            return model
+
+    if not same:
+        print("WARNING: optimized graph changes the logits; keeping the original")
+        return model
+    if len(optimized.graph.node) >= len(model.graph.node):
+        # e.g. fp16 graphs, where the CPU provider wraps kernels in Casts
+        print("onnxruntime optimization did not shrink the graph; keeping the original")
+        return model
+
+    print(f"ORT-optimized graph: {len(model.graph.node)} -> {len(optimized.graph.node)} nodes")
+    return optimized
+
+
+def convert_precision(model, precision):
+    """Return a copy of an FP32 ModelProto converted to a reduced *precision*.
+
+    ``"fp16"`` converts weights and activations to float16 but keeps the
+    float32 ``observation``/``logits`` interface, so callers are unchanged.
+    ``"int8"`` applies dynamic quantization: weights are stored as int8 and
+    activations are quantized on the fly.
+    """
+    import onnx
+
+    if precision == "fp16":
+        from onnxconverter_common import float16
+
+        model = onnx.shape_inference.infer_shapes(model)
+        model = float16.convert_float_to_float16(model, keep_io_types=True)
+    elif precision == "int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        # quantize_dynamic only writes to a path.
+        with tempfile.TemporaryDirectory() as tmp:
+            quantized_path = os.path.join(tmp, "model.int8.onnx")
+            quantize_dynamic(model, quantized_path, weight_type=QuantType.QInt8)
+            model = onnx.load(quantized_path)
+    else:
+        raise ValueError(f"Unknown precision: {precision!r} (expected 'fp32', 'fp16' or 'int8')")
+    print(f"Converted weights to {precision}")
+    return model
+
+
+def export_onnx(checkpoint_path, output_path, validate=True, precision="fp32", simplify=True,
+                dynamic=False, ort_optimize=False):
+    """Load an SB3 PPO model and export its policy to ONNX.
+
+    By default the batch dimension is fixed at 1, which is all the browser
+    ever sends; pass ``dynamic=True`` for a model that accepts any batch size.
+    """
     from stable_baselines3 import PPO
 
     print(f"Loading checkpoint: {checkpoint_path}")
@@ -78,24 +209,46 @@ def export_onnx(checkpoint_path, output_path, validate=True):
     # Export to ONNX
     os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
 
+    # A static batch dimension lets ORT plan memory and shapes once up front.
+    dynamic_axes = None
+    if dynamic:
+        dynamic_axes = {
+            "observation": {0: "batch_size"},
+            "logits": {0: "batch_size"},
+        }
+
+    # Export into memory: the ModelProto is simplified, converted, validated
+    # and written to disk once, instead of being re-read at every stage.
     # Force legacy TorchScript exporter (dynamo=False) for maximum
     # compatibility with onnxruntime-web@1.17.0 WASM backend.
+    import onnx
+
+    exported = io.BytesIO()
     torch.onnx.export(
         wrapper,
         dummy_input,
-        output_path,
+        exported,
         input_names=["observation"],
         output_names=["logits"],
-        dynamic_axes={
-            "observation": {0: "batch_size"},
-            "logits": {0: "batch_size"},
-        },
+        dynamic_axes=dynamic_axes,
         opset_version=17,
         dynamo=False,
     )
+    onnx_model = onnx.load_from_string(exported.getvalue())
+
+    if simplify:
+        onnx_model = simplify_model(onnx_model)
+
+    if precision != "fp32":
+        onnx_model = convert_precision(onnx_model, precision)
+
+    if ort_optimize:
+        onnx_model = ort_optimize_model(onnx_model)
+
+    onnx.save(onnx_model, output_path)
     print(f"ONNX model exported: {output_path}")
 
-    # Remove any leftover external .data file (legacy exporter embeds weights)
+    # Remove any leftover external .data file (weights are embedded)
     data_path = output_path + ".data"
     if os.path.exists(data_path):
         os.remove(data_path)
@@ -103,16 +256,11 @@ def export_onnx(checkpoint_path, output_path, validate=True):
 
     if validate:
         # Validate with onnx checker
-        import onnx
-
-        onnx_model = onnx.load(output_path)
         onnx.checker.check_model(onnx_model)
         print("ONNX checker: model is valid")
 
         # Validate with onnxruntime inference
-        import onnxruntime as ort
-
-        session = ort.InferenceSession(output_path)
+        session = _cpu_session(onnx_model)
         input_name = session.get_inputs()[0].name
         sample_obs = np.random.uniform(-1, 1, (1, OBSERVATION_SIZE)).astype(np.float32)
         outputs = session.run(None, {input_name: sample_obs})
@@ -121,6 +269,10 @@ def export_onnx(checkpoint_path, output_path, validate=True):
         print(f"ORT inference output shape: {logits.shape}")
         print(f"Sample logits: {logits[0][:5]}... (first 5 of {logits.shape[1]})")
 
+        with torch.no_grad():
+            expected = wrapper(torch.from_numpy(sample_obs)).numpy()
+        print(f"Max |ORT - PyTorch| logit difference: {np.abs(logits - expected).max():.2e}")
+
         # Demonstrate action selection
         move_logits = logits[0][:10]
         fire_logits = logits[0][10:12]
@@ -138,6 +290,15 @@ def parse_args():
                         help="Path to SB3 model checkpoint (.zip)")
     parser.add_argument("--output", type=str, default=None,
                         help="Output ONNX file path (default: models/policy.onnx)")
+    parser.add_argument("--precision", choices=["fp32", "fp16", "int8"], default="fp32",
+                        help="Weight precision of the exported model (fp16 needs onnxconverter-common)")
+    parser.add_argument("--dynamic", action="store_true",
+                        help="Export with a dynamic batch dimension (default: fixed batch of 1)")
+    parser.add_argument("--no-simplify", action="store_true",
+                        help="Skip the onnxsim graph simplification pass")
+    parser.add_argument("--ort-optimize", action="store_true",
+                        help="Save the graph after onnxruntime's extended optimizations "
+                             "(adds com.microsoft contrib ops such as FusedGemm)")
     return parser.parse_args()
 
 
@@ -152,7 +313,9 @@ def main():
             "models", "policy.onnx",
         )
 
-    export_onnx(args.checkpoint, output_path)
+    export_onnx(args.checkpoint, output_path, precision=args.precision,
+                simplify=not args.no_simplify, dynamic=args.dynamic,
+                ort_optimize=args.ort_optimize)
 
 
 if __name__ == "__main__":
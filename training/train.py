@@ -10,15 +10,17 @@ Usage examples:
 import argparse
 import os
 import sys
+import threading
 import time
+from collections import deque
 
 import yaml
 import numpy as np
 from stable_baselines3 import PPO
 from stable_baselines3.common.callbacks import BaseCallback
-from stable_baselines3.common.vec_env import SubprocVecEnv
 
 from env import SpaceDogfightEnv, make_env
+from vec_env import BatchedSpaceDogfightVecEnv, ShmemVecEnv
 
 
 def load_config(config_path):
@@ -56,15 +58,69 @@ def build_policy_kwargs(config):
     )
 
 
+def enable_fast_matmul():
+    """Allow TF32 matmuls and let cuDNN autotune kernels for the fixed batch shapes."""
+    import torch
+
+    torch.set_float32_matmul_precision("high")
+    torch.backends.cudnn.benchmark = True
+
+
+def compile_policy(policy, mode="reduce-overhead"):
+    """Compile the policy's networks in place with ``torch.compile``.
+
+    The submodules are compiled rather than the policy itself: rollouts call
+    ``policy.forward`` but PPO updates call ``policy.evaluate_actions``, and
+    both go through these modules.  In-place compilation also keeps the
+    state_dict keys unchanged, so checkpoints load without ``_orig_mod``.
+    """
+    for name in ("features_extractor", "mlp_extractor", "action_net", "value_net"):
+        getattr(policy, name).compile(mode=mode)
+
+
+class AmpPPO(PPO):
+    """PPO whose gradient updates run under bfloat16 autocast on CUDA.
+
+    Only ``train()`` (the ``n_epochs`` of minibatch SGD) is autocast; rollout
+    collection is unchanged.  bf16 keeps float32's exponent range, so no
+    gradient scaling is needed.  On CPU this is plain PPO.
+    """
+
+    def train(self):
+        import torch
+
+        on_cuda = self.device.type == "cuda"
+        with torch.autocast(device_type="cuda", dtype=torch.bfloat16, enabled=on_cuda):
+            super().train()
+
+
 class WinRateCallback(BaseCallback):
-    """Track win rate from episode info dicts and trigger stage promotion."""
+    """Track win rate from episode info dicts and trigger stage promotion.
+
+    Outcomes of the last *window_size* episodes live in a ring buffer with a
+    running sum, so the win rate is O(1) per episode and memory is bounded.
+    """
 
     def __init__(self, window_size=100, promotion_threshold=0.8, verbose=0):
         super().__init__(verbose)
         self.window_size = window_size
         self.promotion_threshold = promotion_threshold
-        self.outcomes = []
+        self.episodes = 0
         self.should_promote = False
+        self._ring = np.zeros(window_size, dtype=np.int8)
+        self._wins = 0
+
+    @property
+    def win_rate(self):
+        """Win rate over the last ``min(episodes, window_size)`` episodes."""
+        count = min(self.episodes, self.window_size)
+        return self._wins / count if count else 0.0
+
+    def _record(self, outcome):
+        slot = self.episodes % self.window_size
+        self._wins += outcome - int(self._ring[slot])
+        self._ring[slot] = outcome
+        self.episodes += 1
 
     def _on_step(self):
         infos = self.locals.get("infos", [])
@@ -75,13 +131,12 @@ class WinRateCallback(BaseCallback):
             terminal_info = info.get("terminal_info", info)
             winner = terminal_info.get("winner")
             if winner is not None:
-                self.outcomes.append(1 if winner == "agent" else 0)
+                self._record(1 if winner == "agent" else 0)
 
-        if len(self.outcomes) >= self.window_size:
-            recent = self.outcomes[-self.window_size:]
-            win_rate = sum(recent) / len(recent)
-            if self.verbose > 0 and len(self.outcomes) % self.window_size == 0:
-                print(f"  Win rate ({len(self.outcomes)} episodes): {win_rate:.2%}")
+        if self.episodes >= self.window_size:
+            win_rate = self.win_rate
+            if self.verbose > 0 and self.episodes % self.window_size == 0:
+                print(f"  Win rate ({self.episodes} episodes): {win_rate:.2%}")
             if win_rate >= self.promotion_threshold:
                 self.should_promote = True
 
@@ -89,54 +144,97 @@ class WinRateCallback(BaseCallback):
 
 
 class MetricsCallback(BaseCallback):
-    """Log reward and episode length periodically."""
+    """Log reward and episode length periodically (over the last 100 episodes)."""
 
     def __init__(self, log_interval=10000, verbose=0):
         super().__init__(verbose)
         self.log_interval = log_interval
-        self.episode_rewards = []
-        self.episode_lengths = []
+        self.episodes = 0
+        self.episode_rewards = deque(maxlen=100)
+        self.episode_lengths = deque(maxlen=100)
 
     def _on_step(self):
         infos = self.locals.get("infos", [])
         for info in infos:
             ep_info = info.get("episode")
             if ep_info is not None:
+                self.episodes += 1
                 self.episode_rewards.append(ep_info["r"])
                 self.episode_lengths.append(ep_info["l"])
 
         if self.num_timesteps % self.log_interval < self.locals.get("n_envs", 1):
             if self.episode_rewards:
-                n = min(100, len(self.episode_rewards))
-                recent_r = self.episode_rewards[-n:]
-                recent_l = self.episode_lengths[-n:]
                 print(
                     f"  [{self.num_timesteps:>8d} steps] "
-                    f"mean_reward={np.mean(recent_r):.2f}  "
-                    f"mean_length={np.mean(recent_l):.0f}  "
-                    f"episodes={len(self.episode_rewards)}"
+                    f"mean_reward={np.mean(self.episode_rewards):.2f}  "
+                    f"mean_length={np.mean(self.episode_lengths):.0f}  "
+                    f"episodes={self.episodes}"
                 )
 
         return True
 
 
+def build_env_config(stage_cfg):
+    """Select the keys of a stage config that the bridge understands."""
+    return {
+        k: stage_cfg[k]
+        for k in ("shipHP", "maxTicks", "asteroidDensity", "enemyPolicy",
+                   "enemyShoots", "spawnDistance", "spawnFacing", "rewardWeights")
+        if k in stage_cfg
+    }
+
+
+def make_vec_env(env_config, num_envs, node_executable, simulate_path, vec="shmem"):
+    """Create the vectorized environment for one stage."""
+    if vec == "batched":
+        # All games in one Node process, stepped by a single batch command
+        return BatchedSpaceDogfightVecEnv(
+            num_envs, env_config, node_executable=node_executable,
+            simulate_path=simulate_path,
+        )
+
+    env_fns = [
+        make_env(env_config, node_executable=node_executable,
+                 simulate_path=simulate_path)
+        for _ in range(num_envs)
+    ]
+    if num_envs > 1:
+        # Observations come back through shared memory instead of the pipe
+        return ShmemVecEnv(env_fns)
+
+    # Single env — avoid subprocess overhead
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    return DummyVecEnv(env_fns)
+
+
+def prewarm_vec_env(vec_env):
+    """Reset *vec_env* on a background thread, starting its Node bridges.
+
+    Returns the thread; join it before using the env.  Errors are not
+    propagated: PPO resets the env again when learning starts and would
+    raise them there.
+    """
+    thread = threading.Thread(target=vec_env.reset, daemon=True)
+    thread.start()
+    return thread
+
+
 def train_stage(config, stage_num, timesteps, num_envs, checkpoint_path,
-                node_executable, simulate_path, checkpoint_dir):
+                node_executable, simulate_path, checkpoint_dir, vec="shmem",
+                amp=False, compile_policy_net=False, next_stage=None, prewarmed=None):
     """Train PPO on a single curriculum stage.
 
-    Returns the path to the saved final checkpoint.
+    If the stage is promoted and *next_stage* is given, that stage's VecEnv is
+    built and reset in the background before returning; pass the returned
+    handle back as *prewarmed* when training it.
+
+    Returns ``(final_checkpoint_path, promoted, prewarmed_next_env_or_None)``.
     """
     stage_cfg = get_stage_config(config, stage_num)
     ppo_cfg = config.get("ppo", {})
     promotion_threshold = stage_cfg.get("promotionThreshold", 0.8)
 
-    # Build environment config for the bridge
-    env_config = {
-        k: stage_cfg[k]
-        for k in ("shipHP", "maxTicks", "asteroidDensity", "enemyPolicy",
-                   "enemyShoots", "spawnDistance", "spawnFacing", "rewardWeights")
-        if k in stage_cfg
-    }
+    env_config = build_env_config(stage_cfg)
 
     print(f"\n{'='*60}")
     print(f"Stage {stage_num}: {stage_cfg.get('description', '')}")
@@ -144,30 +242,28 @@ def train_stage(config, stage_num, timesteps, num_envs, checkpoint_path,
     print(f"  Config: {env_config}")
     print(f"{'='*60}\n")
 
-    # Create vectorized environments
-    env_fns = [
-        make_env(env_config, rank=i, node_executable=node_executable,
-                 simulate_path=simulate_path)
-        for i in range(num_envs)
-    ]
-
-    if num_envs > 1:
-        vec_env = SubprocVecEnv(env_fns)
+    if prewarmed is not None:
+        # Built and reset while the previous stage was saving its checkpoint
+        vec_env, warmup = prewarmed
+        warmup.join()
     else:
-        # Single env — avoid subprocess overhead
-        from stable_baselines3.common.vec_env import DummyVecEnv
-        vec_env = DummyVecEnv(env_fns)
+        vec_env = make_vec_env(env_config, num_envs, node_executable, simulate_path, vec)
 
     # Build or load model
     policy_kwargs = build_policy_kwargs(config)
 
+    ppo_cls = PPO
+    if amp:
+        enable_fast_matmul()
+        ppo_cls = AmpPPO
+
     if checkpoint_path and os.path.exists(checkpoint_path):
         print(f"  Loading checkpoint: {checkpoint_path}")
-        model = PPO.load(checkpoint_path, env=vec_env)
+        model = ppo_cls.load(checkpoint_path, env=vec_env)
         # Override learning rate from config in case it changed between stages
         model.learning_rate = ppo_cfg.get("learning_rate", 3e-4)
     else:
-        model = PPO(
+        model = ppo_cls(
             "MlpPolicy",
             vec_env,
             learning_rate=ppo_cfg.get("learning_rate", 3e-4),
@@ -184,6 +280,9 @@ def train_stage(config, stage_num, timesteps, num_envs, checkpoint_path,
             verbose=0,
         )
 
+    if compile_policy_net:
+        compile_policy(model.policy)
+
     # Callbacks
     win_cb = WinRateCallback(
         window_size=100,
@@ -197,21 +296,28 @@ def train_stage(config, stage_num, timesteps, num_envs, checkpoint_path,
     model.learn(total_timesteps=timesteps, callback=[win_cb, metrics_cb])
     elapsed = time.time() - start_time
 
+    # Start the next stage's Node bridges now so their startup overlaps with
+    # saving this stage's checkpoint and tearing down its environments.
+    next_prewarmed = None
+    if win_cb.should_promote and next_stage is not None:
+        next_env_config = build_env_config(get_stage_config(config, next_stage))
+        next_vec_env = make_vec_env(next_env_config, num_envs, node_executable, simulate_path, vec)
+        next_prewarmed = (next_vec_env, prewarm_vec_env(next_vec_env))
+
     # Save checkpoint
     os.makedirs(checkpoint_dir, exist_ok=True)
     final_path = os.path.join(checkpoint_dir, "final.zip")
     model.save(final_path)
 
     print(f"\n  Stage {stage_num} complete in {elapsed:.1f}s")
-    print(f"  Episodes: {len(win_cb.outcomes)}")
-    if win_cb.outcomes:
-        recent = win_cb.outcomes[-min(100, len(win_cb.outcomes)):]
-        print(f"  Final win rate: {sum(recent)/len(recent):.2%}")
+    print(f"  Episodes: {win_cb.episodes}")
+    if win_cb.episodes:
+        print(f"  Final win rate: {win_cb.win_rate:.2%}")
     print(f"  Checkpoint saved: {final_path}")
 
     vec_env.close()
 
-    return final_path, win_cb.should_promote
+    return final_path, win_cb.should_promote, next_prewarmed
 
 
 def parse_args():
@@ -225,6 +331,13 @@ def parse_args():
                         help="Path to a saved model to resume from")
     parser.add_argument("--num-envs", type=int, default=8,
                         help="Number of parallel environments")
+    parser.add_argument("--vec", choices=["shmem", "batched"], default="shmem",
+                        help="Vectorization: one worker process per env (shmem) "
+                             "or all envs in a single Node process (batched)")
+    parser.add_argument("--amp", action="store_true",
+                        help="Mixed precision: TF32 matmuls and bf16 autocast for PPO updates on CUDA")
+    parser.add_argument("--compile", action="store_true",
+                        help="Compile the policy networks with torch.compile (torch>=2.2)")
     parser.add_argument("--config", type=str, default=None,
                         help="Path to config.yaml")
     parser.add_argument("--auto-promote", action="store_true",
@@ -264,14 +377,19 @@ def main():
     if args.auto_promote:
         # Chain stages sequentially, starting from args.stage
         checkpoint = args.checkpoint
+        prewarmed = None
         for stage_num in range(args.stage, 6):
+            next_stage = stage_num + 1
             checkpoint_dir = os.path.join(
                 os.path.dirname(os.path.abspath(__file__)),
                 "checkpoints", f"stage{stage_num}",
             )
-            final_path, promoted = train_stage(
+            final_path, promoted, prewarmed = train_stage(
                 config, stage_num, timesteps, args.num_envs,
                 checkpoint, args.node, args.simulate, checkpoint_dir,
+                vec=args.vec, amp=args.amp, compile_policy_net=args.compile,
+                next_stage=next_stage if next_stage <= 5 and next_stage in config["stages"] else None,
+                prewarmed=prewarmed,
             )
             checkpoint = final_path
             if not promoted:
@@ -286,6 +404,7 @@ def main():
         train_stage(
             config, args.stage, timesteps, args.num_envs,
             args.checkpoint, args.node, args.simulate, checkpoint_dir,
+            vec=args.vec, amp=args.amp, compile_policy_net=args.compile,
         )
 
 
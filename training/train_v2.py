@@ -4,7 +4,8 @@ PPO training script (v2) with curriculum support for Space Dogfight RL agent.
 Changes vs v1:
 - Auto-promote can switch stages as soon as promotion threshold is reached (early stop).
 - Win-rate counting is now "once per episode" (avoids repeated counts per episode / per env step).
-- Writes metadata next to checkpoints (meta.json) so you always know what stage a checkpoint is from.
+- Writes metadata next to checkpoints so you always know what stage a checkpoint is from:
+  config.json (stage settings), outcomes.bin (one byte per episode, 1 = win) and meta.json (summary).
 - Optional: continue through all stages even if promotion threshold is not reached.
 - Optional: require a minimum number of completed episodes before promotion can trigger.
 
@@ -13,27 +14,39 @@ Usage examples:
     python training/train_v2.py --auto-promote --timesteps 2000000 --num-envs 4
     python training/train_v2.py --auto-promote --timesteps 2000000 --num-envs 4 --early-stop
     python training/train_v2.py --auto-promote --timesteps 2000000 --num-envs 4 --early-stop --continue-all-stages
+    python training/train_v2.py --auto-promote --timesteps 2000000 --num-envs 16 --vec batched
+    python training/train_v2.py --auto-promote --timesteps 2000000 --num-envs 32 --envs-per-worker 4
     python training/train_v2.py --stage 3 --checkpoint training/checkpoints/stage3/final.zip --timesteps 500000
 """
 
 import argparse
 import json
+import multiprocessing as mp
 import os
 import sys
 import time
+from collections import deque
 
 import yaml
 import numpy as np
+import torch
 from stable_baselines3 import PPO
 from stable_baselines3.common.callbacks import BaseCallback
-from stable_baselines3.common.vec_env import SubprocVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 
 from env import SpaceDogfightEnv, make_env
+from vec_env import BatchedSpaceDogfightVecEnv, ShmemVecEnv, default_start_method
+
+# libyaml's C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
 
 def load_config(config_path):
     with open(config_path, "r") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YamlLoader)
 
 
 def get_stage_config(config, stage_num):
@@ -43,23 +56,44 @@ def get_stage_config(config, stage_num):
     return stages[stage_num]
 
 
-def build_policy_kwargs(config):
-    import torch
+# Stage config keys forwarded to the simulator
+_ENV_KEYS = (
+    "shipHP",
+    "enemyHP",
+    "maxTicks",
+    "asteroidDensity",
+    "enemyPolicy",
+    "enemyShoots",
+    "spawnDistance",
+    "spawnFacing",
+    "rewardWeights",
+    "aiMaxSpeedFactor",
+)
 
-    activation_map = {
-        "ReLU": torch.nn.ReLU,
-        "Tanh": torch.nn.Tanh,
-        "ELU": torch.nn.ELU,
-    }
+_ACTIVATION_MAP = {
+    "ReLU": torch.nn.ReLU,
+    "Tanh": torch.nn.Tanh,
+    "ELU": torch.nn.ELU,
+}
+
+
+def build_env_config(stage_cfg):
+    """Select the keys of a stage config that the bridge understands."""
+    return {k: stage_cfg[k] for k in _ENV_KEYS if k in stage_cfg}
 
+
+def build_policy_kwargs(config):
     policy_cfg = config.get("policy", {})
     net_arch = policy_cfg.get("net_arch", {"pi": [256, 256, 256], "vf": [256, 256, 256]})
-    activation_name = policy_cfg.get("activation_fn", "ReLU")
-    activation_fn = activation_map.get(activation_name, torch.nn.ReLU)
+    activation_fn = _ACTIVATION_MAP.get(policy_cfg.get("activation_fn", "ReLU"), torch.nn.ReLU)
 
     return dict(net_arch=net_arch, activation_fn=activation_fn)
 
 
+# Outcomes buffered before each append to outcomes.bin
+OUTCOMES_CHUNK = 1024
+
+
 class WinRateCallback(BaseCallback):
     """
     Tracks win rate from episode terminal infos.
@@ -72,21 +106,74 @@ class WinRateCallback(BaseCallback):
       - windowed win-rate >= threshold
     """
 
-    def __init__(self, window_size=100, promotion_threshold=0.8, min_episodes=100, verbose=0):
+    def __init__(self, window_size=100, promotion_threshold=0.8, min_episodes=100, outcomes_path=None, verbose=0):
         super().__init__(verbose)
         self.window_size = int(window_size)
         self.promotion_threshold = float(promotion_threshold)
         self.min_episodes = int(min_episodes)
-
-        self.outcomes = []  # 1 = agent win, 0 = agent loss
+        # Episodes needed before the win rate is evaluated at all
+        self._promote_floor = max(self.window_size, self.min_episodes)
+
+        # Every outcome is appended to outcomes_path (one byte each), in chunks
+        self.outcomes_path = outcomes_path
+        self._unflushed = bytearray()
+
+        # 1 = agent win, 0 = agent loss; rolling window plus its running sum
+        self._window = deque(maxlen=self.window_size)
+        self._win_sum = 0
+        self.episodes = 0
+        # Last 100 outcomes (ring buffer), for the checkpoint metadata
+        self._tail = np.zeros(100, dtype=np.uint8)
         self.should_promote = False
 
         # To avoid printing the same window milestone repeatedly
         self._last_print_milestone = 0
 
+    @property
+    def win_rate(self):
+        return self._win_sum / len(self._window) if self._window else 0.0
+
+    @property
+    def outcomes(self):
+        """The last (up to) 100 outcomes, in ring-buffer order."""
+        return self._tail[: min(self.episodes, len(self._tail))]
+
+    def _record(self, outcome):
+        if len(self._window) == self.window_size:
+            self._win_sum -= self._window[0]
+        self._window.append(outcome)
+        self._win_sum += outcome
+        self._tail[self.episodes % len(self._tail)] = outcome
+        self.episodes += 1
+        if self.outcomes_path is not None:
+            self._unflushed.append(outcome)
+            if len(self._unflushed) >= OUTCOMES_CHUNK:
+                self.flush_outcomes()
+
+    def flush_outcomes(self):
+        if self.outcomes_path is None or not self._unflushed:
+            return
+        with open(self.outcomes_path, "ab") as f:
+            f.write(self._unflushed)
+        self._unflushed.clear()
+
+    def _on_training_start(self):
+        if self.outcomes_path is not None:
+            # A fresh log per stage run
+            open(self.outcomes_path, "wb").close()
+
+    def _on_training_end(self):
+        self.flush_outcomes()
+
     def _on_step(self):
-        infos = self.locals.get("infos", [])
-        for info in infos:
+        dones = self.locals.get("dones")
+        if dones is None or not dones.any():
+            return True
+
+        infos = self.locals["infos"]
+        ended = False
+        for i in np.flatnonzero(dones):
+            info = infos[i]
             # Only count at episode end
             ep_info = info.get("episode")
             if ep_info is None:
@@ -97,17 +184,16 @@ class WinRateCallback(BaseCallback):
             if winner is None:
                 continue
 
-            self.outcomes.append(1 if winner == "agent" else 0)
+            self._record(1 if winner == "agent" else 0)
+            ended = True
 
-        n = len(self.outcomes)
-        if n >= max(self.window_size, self.min_episodes):
-            recent = self.outcomes[-self.window_size :]
-            win_rate = sum(recent) / len(recent)
+        n = self.episodes
+        if ended and n >= self._promote_floor:
+            win_rate = self.win_rate
 
             # Print at milestones (100, 200, 300...) to keep logs readable
-            milestone = (n // self.window_size) * self.window_size
-            if self.verbose > 0 and milestone != self._last_print_milestone:
-                self._last_print_milestone = milestone
+            if self.verbose > 0 and n - self._last_print_milestone >= self.window_size:
+                self._last_print_milestone = n - n % self.window_size
                 print(f"  Win rate ({n} episodes, last {self.window_size}): {win_rate:.2%}")
 
             if win_rate >= self.promotion_threshold:
@@ -119,33 +205,45 @@ class WinRateCallback(BaseCallback):
 class MetricsCallback(BaseCallback):
     """Log reward and episode length periodically."""
 
-    def __init__(self, log_interval=10000, verbose=0):
+    def __init__(self, log_interval=10000, window_size=100, verbose=0):
         super().__init__(verbose)
         self.log_interval = int(log_interval)
-        self.episode_rewards = []
-        self.episode_lengths = []
+        self.window_size = int(window_size)
+        # Ring buffers over the last window_size episodes, plus their running sums
+        self._rewards = np.zeros(self.window_size, dtype=np.float64)
+        self._lengths = np.zeros(self.window_size, dtype=np.int64)
+        self._reward_sum = 0.0
+        self._length_sum = 0
+        self.episodes = 0
         self._last_log_step = 0
 
+    def _record(self, reward, length):
+        slot = self.episodes % self.window_size
+        self._reward_sum += reward - self._rewards[slot]
+        self._length_sum += length - int(self._lengths[slot])
+        self._rewards[slot] = reward
+        self._lengths[slot] = length
+        self.episodes += 1
+
     def _on_step(self):
-        infos = self.locals.get("infos", [])
-        for info in infos:
-            ep_info = info.get("episode")
-            if ep_info is not None:
-                self.episode_rewards.append(ep_info["r"])
-                self.episode_lengths.append(ep_info["l"])
+        dones = self.locals.get("dones")
+        if dones is not None and dones.any():
+            infos = self.locals["infos"]
+            for i in np.flatnonzero(dones):
+                ep_info = infos[i].get("episode")
+                if ep_info is not None:
+                    self._record(ep_info["r"], ep_info["l"])
 
         # Avoid spamming due to n_envs
         if self.num_timesteps - self._last_log_step >= self.log_interval:
             self._last_log_step = self.num_timesteps
-            if self.episode_rewards:
-                n = min(100, len(self.episode_rewards))
-                recent_r = self.episode_rewards[-n:]
-                recent_l = self.episode_lengths[-n:]
+            if self.episodes:
+                n = min(self.window_size, self.episodes)
                 print(
                     f"  [{self.num_timesteps:>8d} steps] "
-                    f"mean_reward={np.mean(recent_r):.2f}  "
-                    f"mean_length={np.mean(recent_l):.0f}  "
-                    f"episodes={len(self.episode_rewards)}"
+                    f"mean_reward={self._reward_sum / n:.2f}  "
+                    f"mean_length={self._length_sum / n:.0f}  "
+                    f"episodes={self.episodes}"
                 )
 
         return True
@@ -163,18 +261,53 @@ class StopOnPromotionCallback(BaseCallback):
         return not self.win_cb.should_promote
 
 
-def _save_meta(checkpoint_dir, stage_num, env_config, ppo_cfg, promotion_threshold, timesteps, outcomes):
-    meta = {
+def rollout_n_steps(ppo_cfg, num_envs, scale_n_steps=False):
+    """Per-env ``n_steps`` for PPO.
+
+    With *scale_n_steps*, the configured ``n_steps`` is the total rollout
+    size and is split across the envs, so adding envs shortens each env's
+    rollout instead of growing the buffer.
+    """
+    n_steps = ppo_cfg.get("n_steps", 2048)
+    if not scale_n_steps or num_envs <= 1:
+        return n_steps
+    if n_steps % num_envs:
+        raise ValueError(f"n_steps ({n_steps}) is not divisible by num_envs ({num_envs})")
+    batch_size = ppo_cfg.get("batch_size", 64)
+    if n_steps % batch_size:
+        raise ValueError(f"n_steps ({n_steps}) is not a multiple of batch_size ({batch_size})")
+    return n_steps // num_envs
+
+
+def _save_stage_config(checkpoint_dir, stage_num, env_config, ppo_cfg, promotion_threshold, timesteps):
+    """Write the stage's static settings to config.json, unless an identical file is already there."""
+    stage_config = {
         "stage": stage_num,
-        "timestamp": time.time(),
         "env_config": env_config,
         "ppo_config": ppo_cfg,
         "promotion_threshold": promotion_threshold,
         "timesteps_budget": timesteps,
-        "episodes_counted": len(outcomes),
-        "recent_win_rate_window_100": (
-            float(sum(outcomes[-100:]) / len(outcomes[-100:])) if len(outcomes) >= 1 else None
-        ),
+    }
+    text = json.dumps(stage_config, indent=2)
+    config_path = os.path.join(checkpoint_dir, "config.json")
+    if os.path.exists(config_path):
+        with open(config_path, "r") as f:
+            if f.read() == text:
+                return config_path
+    with open(config_path, "w") as f:
+        f.write(text)
+    return config_path
+
+
+def _save_meta(checkpoint_dir, stage_num, outcomes, episodes):
+    """Write the end-of-stage summary; settings live in config.json, outcomes in outcomes.bin."""
+    meta = {
+        "stage": stage_num,
+        "timestamp": time.time(),
+        "config": "config.json",
+        "outcomes": "outcomes.bin",
+        "episodes_counted": episodes,
+        "recent_win_rate_window_100": float(outcomes.mean()) if len(outcomes) else None,
     }
     meta_path = os.path.join(checkpoint_dir, "meta.json")
     with open(meta_path, "w") as f:
@@ -182,6 +315,68 @@ def _save_meta(checkpoint_dir, stage_num, env_config, ppo_cfg, promotion_thresho
     return meta_path
 
 
+# Per-step cost of driving shmem workers: a pipe round trip per worker plus the
+# shared-array copies, roughly 30 us per worker measured on Linux, rounded up.
+SHMEM_STEP_OVERHEAD = 1e-4
+
+
+def median_step_time(env_config, node_executable, simulate_path, steps=20):
+    """Median wall time of one ``step()`` on a freshly reset env."""
+    env = make_env(env_config, node_executable=node_executable, simulate_path=simulate_path)()
+    try:
+        env.reset()
+        times = []
+        for _ in range(steps):
+            action = env.action_space.sample()
+            start = time.perf_counter()
+            _, _, terminated, truncated, _ = env.step(action)
+            times.append(time.perf_counter() - start)
+            if terminated or truncated:
+                env.reset()
+    finally:
+        env.close()
+    return float(np.median(times))
+
+
+def make_vec_env(
+    env_config, num_envs, node_executable, simulate_path, vec="auto", envs_per_worker=1, start_method=None
+):
+    """Create the vectorized environment for one stage.
+
+    ``vec="auto"`` times a single env and keeps the envs in-process
+    (DummyVecEnv) only when stepping all of them one after another costs less
+    than the IPC of a worker step, or when there is a single core to run on.
+    """
+    if vec == "auto":
+        if num_envs == 1 or (os.cpu_count() or 1) == 1:
+            vec = "dummy"
+        else:
+            step_time = median_step_time(env_config, node_executable, simulate_path)
+            serial_time = num_envs * step_time
+            vec = "shmem" if serial_time > SHMEM_STEP_OVERHEAD else "dummy"
+            print(f"  Auto vec env: {vec} ({num_envs} envs x median step {step_time * 1000:.2f} ms)")
+
+    if vec == "batched":
+        # All games in one Node process, stepped by a single batch command
+        return BatchedSpaceDogfightVecEnv(
+            num_envs, env_config, node_executable=node_executable, simulate_path=simulate_path
+        )
+
+    env_fns = [
+        make_env(env_config, node_executable=node_executable, simulate_path=simulate_path)
+        for _ in range(num_envs)
+    ]
+
+    if num_envs > 1 and vec != "dummy":
+        start_method = start_method or default_start_method()
+        if vec == "subproc":
+            return SubprocVecEnv(env_fns, start_method=start_method)
+        # Observations, rewards and dones come back through shared memory
+        return ShmemVecEnv(env_fns, start_method=start_method, envs_per_worker=envs_per_worker)
+
+    return DummyVecEnv(env_fns)
+
+
 def train_stage(
     config,
     stage_num,
@@ -193,61 +388,72 @@ def train_stage(
     checkpoint_dir,
     early_stop,
     min_episodes_before_promote,
+    vec="auto",
+    envs_per_worker=1,
+    start_method=None,
+    scale_n_steps=False,
+    vec_env=None,
+    model=None,
+    keep_env=False,
 ):
-    """Train PPO on a single curriculum stage. Returns (final_checkpoint_path, should_promote)."""
+    """Train PPO on a single curriculum stage.
+
+    *vec_env* and *model* may be carried over from the previous stage: the
+    running envs are switched to this stage's config and training continues
+    on the same model, instead of respawning every worker and rebuilding
+    PPO.  With *keep_env* the vec env is left open for the next stage.
+
+    Returns (final_checkpoint_path, should_promote, vec_env, model); vec_env
+    and model are None unless *keep_env*.
+    """
 
     stage_cfg = get_stage_config(config, stage_num)
     ppo_cfg = config.get("ppo", {})
     promotion_threshold = stage_cfg.get("promotionThreshold", 0.8)
 
-    env_config = {
-        k: stage_cfg[k]
-        for k in (
-            "shipHP",
-            "enemyHP",
-            "maxTicks",
-            "asteroidDensity",
-            "enemyPolicy",
-            "enemyShoots",
-            "spawnDistance",
-            "spawnFacing",
-            "rewardWeights",
-            "aiMaxSpeedFactor",
-        )
-        if k in stage_cfg
-    }
+    env_config = build_env_config(stage_cfg)
+    # Validated before anything is written or any worker is started
+    n_steps = rollout_n_steps(ppo_cfg, num_envs, scale_n_steps)
 
     print(f"\n{'='*60}")
     print(f"Stage {stage_num}: {stage_cfg.get('description', '')}")
-    print(f"  Envs: {num_envs}  Timesteps budget: {timesteps}  Early-stop: {early_stop}")
+    print(
+        f"  Envs: {num_envs} ({vec}, {envs_per_worker}/worker)  "
+        f"Timesteps budget: {timesteps}  Early-stop: {early_stop}"
+    )
     print(f"  Promotion threshold: {promotion_threshold}  Min episodes: {min_episodes_before_promote}")
     print(f"  Config: {env_config}")
     print(f"{'='*60}\n")
 
-    env_fns = [
-        make_env(env_config, rank=i, node_executable=node_executable, simulate_path=simulate_path)
-        for i in range(num_envs)
-    ]
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    _save_stage_config(checkpoint_dir, stage_num, env_config, ppo_cfg, promotion_threshold, timesteps)
 
-    if num_envs > 1:
-        vec_env = SubprocVecEnv(env_fns)
+    if vec_env is None:
+        vec_env = make_vec_env(
+            env_config, num_envs, node_executable, simulate_path, vec, envs_per_worker, start_method
+        )
+    elif hasattr(vec_env, "set_stage_config"):
+        vec_env.set_stage_config(env_config)
     else:
-        from stable_baselines3.common.vec_env import DummyVecEnv
-
-        vec_env = DummyVecEnv(env_fns)
+        # Takes effect on the reset PPO does when learning starts
+        vec_env.env_method("set_stage_config", env_config)
 
     policy_kwargs = build_policy_kwargs(config)
 
-    if checkpoint_path and os.path.exists(checkpoint_path):
+    if model is not None:
+        print("  Continuing with the previous stage's model")
+    elif checkpoint_path and os.path.exists(checkpoint_path):
         print(f"  Loading checkpoint: {checkpoint_path}")
-        model = PPO.load(checkpoint_path, env=vec_env)
+        # The checkpoint's own n_steps is kept unless scaling was asked for
+        load_kwargs = {"n_steps": n_steps} if scale_n_steps else {}
+        model = PPO.load(checkpoint_path, env=vec_env, **load_kwargs)
         model.learning_rate = ppo_cfg.get("learning_rate", 3e-4)
     else:
         model = PPO(
             "MlpPolicy",
             vec_env,
             learning_rate=ppo_cfg.get("learning_rate", 3e-4),
-            n_steps=ppo_cfg.get("n_steps", 2048),
+            n_steps=n_steps,
             batch_size=ppo_cfg.get("batch_size", 64),
             n_epochs=ppo_cfg.get("n_epochs", 10),
             gamma=ppo_cfg.get("gamma", 0.99),
@@ -264,6 +470,7 @@ def train_stage(
         window_size=100,
         promotion_threshold=promotion_threshold,
         min_episodes=min_episodes_before_promote,
+        outcomes_path=os.path.join(checkpoint_dir, "outcomes.bin"),
         verbose=1,
     )
     metrics_cb = MetricsCallback(log_interval=10000, verbose=1)
@@ -276,29 +483,22 @@ def train_stage(
     model.learn(total_timesteps=timesteps, callback=callbacks)
     elapsed = time.time() - start_time
 
-    os.makedirs(checkpoint_dir, exist_ok=True)
     final_path = os.path.join(checkpoint_dir, "final.zip")
     model.save(final_path)
-    meta_path = _save_meta(
-        checkpoint_dir,
-        stage_num,
-        env_config,
-        ppo_cfg,
-        promotion_threshold,
-        timesteps,
-        win_cb.outcomes,
-    )
+    meta_path = _save_meta(checkpoint_dir, stage_num, win_cb.outcomes, win_cb.episodes)
 
     print(f"\n  Stage {stage_num} complete in {elapsed:.1f}s")
-    print(f"  Episodes counted: {len(win_cb.outcomes)}")
-    if win_cb.outcomes:
-        recent = win_cb.outcomes[-min(100, len(win_cb.outcomes)) :]
-        print(f"  Final win rate (last {len(recent)}): {sum(recent)/len(recent):.2%}")
+    print(f"  Episodes counted: {win_cb.episodes}")
+    recent = win_cb.outcomes
+    if len(recent):
+        print(f"  Final win rate (last {len(recent)}): {recent.mean():.2%}")
     print(f"  Checkpoint saved: {final_path}")
     print(f"  Meta saved: {meta_path}")
 
+    if keep_env:
+        return final_path, win_cb.should_promote, vec_env, model
     vec_env.close()
-    return final_path, win_cb.should_promote
+    return final_path, win_cb.should_promote, None, None
 
 
 def parse_args():
@@ -313,6 +513,39 @@ def parse_args():
     )
     parser.add_argument("--checkpoint", type=str, default=None, help="Path to a saved model to resume from")
     parser.add_argument("--num-envs", type=int, default=4, help="Number of parallel environments")
+    parser.add_argument(
+        "--vec",
+        choices=["auto", "shmem", "subproc", "dummy", "batched"],
+        default="auto",
+        help=(
+            "Vectorization: worker processes with shared-memory results (shmem) or pickled results "
+            "(subproc), all envs in-process (dummy), all envs batched in a single Node process, or "
+            "auto (dummy if stepping every env in turn takes under 0.1 ms, or on a single core; else shmem)"
+        ),
+    )
+    parser.add_argument(
+        "--envs-per-worker",
+        type=int,
+        default=None,
+        help="Envs stepped sequentially by each shmem worker process (default: num_envs // cpu_count, at least 1)",
+    )
+    parser.add_argument(
+        "--torch-threads",
+        type=int,
+        default=None,
+        help="Intra-op threads for the policy (default: cpu_count minus one per Node process, at least 1)",
+    )
+    parser.add_argument(
+        "--start-method",
+        choices=["fork", "forkserver", "spawn"],
+        default=None,
+        help="How env worker processes are started (default: fork on Linux, else forkserver/spawn)",
+    )
+    parser.add_argument(
+        "--scale-n-steps",
+        action="store_true",
+        help="Treat ppo.n_steps as the total rollout size and split it across --num-envs",
+    )
     parser.add_argument("--config", type=str, default=None, help="Path to config.yaml")
     parser.add_argument("--auto-promote", action="store_true", help="Automatically promote through curriculum stages")
     parser.add_argument(
@@ -339,13 +572,33 @@ def parse_args():
 def main():
     args = parse_args()
 
+    here = os.path.dirname(os.path.abspath(__file__))
+    checkpoint_root = os.path.join(here, "checkpoints")
+
     if args.config:
         config_path = args.config
     else:
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+        config_path = os.path.join(here, "config.yaml")
 
     config = load_config(config_path)
 
+    # Leave a core per Node.js simulator (one in total when batched) instead of
+    # letting torch claim every core and fight the workers for them.
+    if args.torch_threads is None:
+        node_procs = 1 if args.vec == "batched" else args.num_envs
+        args.torch_threads = max(1, (os.cpu_count() or 4) - node_procs)
+    torch.set_num_threads(args.torch_threads)
+    torch.set_num_interop_threads(1)
+
+    # Fix the worker start method for the whole process once, before any
+    # vec env (or anything else) starts a child process.
+    if args.start_method is None:
+        args.start_method = default_start_method()
+    mp.set_start_method(args.start_method, force=True)
+
+    if args.envs_per_worker is None:
+        args.envs_per_worker = max(1, args.num_envs // (os.cpu_count() or 1))
+
     if args.episodes is not None and args.timesteps is not None:
         print("Error: --episodes and --timesteps are mutually exclusive", file=sys.stderr)
         sys.exit(1)
@@ -362,13 +615,11 @@ def main():
     if args.auto_promote:
         checkpoint = args.checkpoint
         max_stage = max(config["stages"].keys())
+        # One set of env workers and one model for the whole curriculum
+        vec_env = model = None
         for stage_num in range(args.stage, max_stage + 1):
-            checkpoint_dir = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)),
-                "checkpoints",
-                f"stage{stage_num}",
-            )
-            final_path, promoted = train_stage(
+            checkpoint_dir = os.path.join(checkpoint_root, f"stage{stage_num}")
+            final_path, promoted, vec_env, model = train_stage(
                 config=config,
                 stage_num=stage_num,
                 timesteps=timesteps,
@@ -379,6 +630,13 @@ def main():
                 checkpoint_dir=checkpoint_dir,
                 early_stop=args.early_stop,
                 min_episodes_before_promote=args.min_episodes_before_promote,
+                vec=args.vec,
+                envs_per_worker=args.envs_per_worker,
+                start_method=args.start_method,
+                scale_n_steps=args.scale_n_steps,
+                vec_env=vec_env,
+                model=model,
+                keep_env=True,
             )
             checkpoint = final_path
 
@@ -389,12 +647,10 @@ def main():
                 if not args.continue_all_stages:
                     print("  Stopping (use --continue-all-stages to force running later stages).")
                     break
+        if vec_env is not None:
+            vec_env.close()
     else:
-        checkpoint_dir = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            "checkpoints",
-            f"stage{args.stage}",
-        )
+        checkpoint_dir = os.path.join(checkpoint_root, f"stage{args.stage}")
         train_stage(
             config=config,
             stage_num=args.stage,
@@ -406,6 +662,10 @@ def main():
             checkpoint_dir=checkpoint_dir,
             early_stop=args.early_stop,
             min_episodes_before_promote=args.min_episodes_before_promote,
+            vec=args.vec,
+            envs_per_worker=args.envs_per_worker,
+            start_method=args.start_method,
+            scale_n_steps=args.scale_n_steps,
         )
 
 
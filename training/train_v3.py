@@ -12,13 +12,23 @@ Usage examples (single line):
   python training/train_v4.py --auto-promote --stage 1 --early-stop --timesteps 50000000 --num-envs 4 --min-episodes-before-promote 200
   python training/train_v4.py --auto-promote --stage 3 --early-stop --timesteps 50000000 --num-envs 4 --min-episodes-before-promote 200 --checkpoint training/checkpoints/stage3/final.zip
   python training/train_v4.py --stage 2 --timesteps 1000000 --num-envs 4
+  python training/train_v4.py --stage 2 --timesteps 1000000 --num-envs 16 --vec batched
+  python training/train_v4.py --stage 2 --timesteps 1000000 --num-envs 8 --vec shmem
+  python training/train_v4.py --stage 2 --timesteps 1000000 --num-envs 32 --vec shmem --envs-per-worker 4
 """
 
 import argparse
+import atexit
+import functools
+import io
 import json
 import os
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 from typing import Optional
 
 import yaml
@@ -28,11 +38,111 @@ from stable_baselines3.common.callbacks import BaseCallback
 from stable_baselines3.common.vec_env import SubprocVecEnv
 
 from env import make_env
+from vec_env import BatchedSpaceDogfightVecEnv, ShmemVecEnv
+
+# libyaml's C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used when orjson is absent
+    orjson = None
+
+if orjson is not None:
+    # Accept int dict keys (as stdlib json does) and numpy scalars
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def _json_dumps(obj, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=(_ORJSON_OPTS | orjson.OPT_INDENT_2) if indent else _ORJSON_OPTS)
+
+    _json_loads = orjson.loads
+else:
+    _JSON_ENCODER = json.JSONEncoder()
+    _JSON_INDENT_ENCODER = json.JSONEncoder(indent=2)
+
+    def _json_dumps(obj, indent: bool = False) -> bytes:
+        return (_JSON_INDENT_ENCODER if indent else _JSON_ENCODER).encode(obj).encode()
+
+    _json_loads = json.loads
+
+# Per-env step rewards MetricsCallback keeps for its rolling mean
+REWARD_HISTORY = 2000
+
+# FusedTrainingCallback reads the clock only on steps where n_calls & CLOCK_CHECK_MASK == 0,
+# so print_every_seconds is honored to within CLOCK_CHECK_MASK + 1 vec-env steps
+CLOCK_CHECK_MASK = 1023
+
+# Write buffer for the per-stage JSONL log
+JSONL_BUFFER_BYTES = 1 << 14
+
+# Entries kept in dashboard_data.js; the per-stage JSONL keeps the full history
+DASHBOARD_MAX_ENTRIES = 2000
+_DASHBOARD_PREFIX = "// Auto-generated by train_v3.py — do not edit\nvar DASHBOARD_DATA = ".encode()
+
+
+# Checkpoint and log writes run here, off the training thread. One worker keeps
+# them in submission order.
+_io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="train_v3-io")
+_io_pending: deque[Future] = deque()
+
+
+def _submit_io(fn, *args) -> None:
+    """Queue a file write on the background I/O thread."""
+    while _io_pending and _io_pending[0].done():
+        _io_pending.popleft().result()  # surface a failed write on the training thread
+    _io_pending.append(_io_executor.submit(fn, *args))
+
+
+def flush_io() -> None:
+    """Block until every queued write has finished, re-raising the first failure."""
+    while _io_pending:
+        _io_pending.popleft().result()
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+# Stage-config keys forwarded to the env
+_ENV_CONFIG_KEYS: tuple[str, ...] = (
+    "shipHP",
+    "enemyHP",
+    "maxTicks",
+    "asteroidDensity",
+    "enemyPolicy",
+    "enemyShoots",
+    "spawnDistance",
+    "spawnFacing",
+    "rewardWeights",
+    "frameSkip",
+    "aiHoldTime",
+    "aiSimSteps",
+    "aiMaxSpeedFactor",
+    "selfPlayModelPath",
+    "evasionWaypointRadius",
+    "evasionArrivalDist",
+    "evasionMaxHoldTime",
+    "evasionCandidates",
+    "evasionSpeedFactor",
+    "enemyFireCooldown",
+    "campCheckTicks",
+    "campMinClosing",
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _parse_config(config_path: str, mtime_ns: int) -> dict:
+    with open(config_path, "r") as f:
+        return yaml.load(f, Loader=YamlLoader)
 
 
 def load_config(config_path: str) -> dict:
-    with open(config_path, "r") as f:
-        return yaml.safe_load(f)
+    """Parse config.yaml, reusing the last parse while the file is unchanged. Treat the result as read-only."""
+    return _parse_config(os.path.abspath(config_path), os.stat(config_path).st_mtime_ns)
 
 
 def get_stage_config(config: dict, stage_num: int) -> dict:
@@ -59,12 +169,74 @@ def build_policy_kwargs(config: dict) -> dict:
     return dict(net_arch=net_arch, activation_fn=activation_fn)
 
 
-class WinRateCallback(BaseCallback):
+def accelerate_policy(model: PPO, ppo_cfg: dict) -> list[str]:
+    """
+    Apply the opt-in policy speedups from ppo_cfg and return the names of those enabled.
+
+    - compile_policy: torch.compile the MLP extractor's forward (rollouts and updates).
+    - bf16_inference: run the rollout pass through the MLP extractor under bfloat16
+      autocast. The value head, action head and log-prob stay in fp32, as do updates
+      (evaluate_actions), so values and old log-probs are not computed in bf16.
+
+    Only forward methods are replaced, so parameters and checkpoints are unchanged.
+    """
+    import torch
+
+    policy = model.policy
+    enabled = []
+
+    if ppo_cfg.get("compile_policy", False):
+        extractor = policy.mlp_extractor
+        extractor.forward = torch.compile(extractor.forward)
+        enabled.append("compile_policy")
+
+    if ppo_cfg.get("bf16_inference", False):
+        device_type = policy.device.type
+
+        # ActorCriticPolicy.forward, with only the hidden layers under autocast
+        def bf16_forward(obs, deterministic: bool = False):
+            features = policy.extract_features(obs)
+            with torch.autocast(device_type=device_type, dtype=torch.bfloat16):
+                if policy.share_features_extractor:
+                    latent_pi, latent_vf = policy.mlp_extractor(features)
+                else:
+                    pi_features, vf_features = features
+                    latent_pi = policy.mlp_extractor.forward_actor(pi_features)
+                    latent_vf = policy.mlp_extractor.forward_critic(vf_features)
+            latent_pi, latent_vf = latent_pi.float(), latent_vf.float()
+            values = policy.value_net(latent_vf)
+            distribution = policy._get_action_dist_from_latent(latent_pi)
+            actions = distribution.get_actions(deterministic=deterministic)
+            log_prob = distribution.log_prob(actions)
+            actions = actions.reshape((-1, *policy.action_space.shape))
+            return actions, values, log_prob
+
+        policy.forward = bf16_forward
+        enabled.append("bf16_inference")
+
+    return enabled
+
+
+class DrivenCallback(BaseCallback):
+    """
+    Base for the callbacks that FusedTrainingCallback drives.
+
+    Each one holds a piece of the stage's training state and exposes the per-step
+    work (record, print, check, log) that the fused callback calls. SB3 never steps
+    them directly, so `_on_step` does nothing and all per-step logic lives in one place.
+    """
+
+    def _on_step(self) -> bool:
+        return True
+
+
+class WinRateCallback(DrivenCallback):
     """
     Counts episode outcomes using VecEnv done flags (no dependency on Monitor).
 
     Assumptions:
-    - SB3 passes `dones` and `infos` into callback locals each step.
+    - FusedTrainingCallback hands it the `dones` and `infos` from SB3's callback
+      locals each step.
     - When dones[i] is True, infos[i] contains terminal data and includes either:
         - info["terminal_info"]["winner"], OR
         - info["winner"]
@@ -75,29 +247,35 @@ class WinRateCallback(BaseCallback):
       - rolling win rate over last window_size episodes >= promotion_threshold
     """
 
+    # winner -> outcome_details label; any other winner counts as a loss
+    _WINNER_TO_LABEL = {"agent": "win", "draw_mutual": "draw_mutual", "timeout": "timeout"}
+    _WINNER_IS_WIN = {"agent": 1}
+
     def __init__(
         self,
         window_size: int = 100,
         promotion_threshold: float = 0.8,
         min_episodes: int = 200,
-        print_every_seconds: float = 10.0,
         verbose: int = 0,
     ):
         super().__init__(verbose)
         self.window_size = int(window_size)
         self.promotion_threshold = float(promotion_threshold)
         self.min_episodes = int(min_episodes)
-        self.print_every_seconds = float(print_every_seconds)
 
-        self.outcomes: list[int] = []  # 1 = agent win, 0 = agent loss
-        self.outcome_details: list[str] = []  # 'win', 'loss', 'draw_mutual', 'timeout'
+        # Only the last window_size episodes are kept; `episodes` counts them all
+        self.outcomes: deque[int] = deque(maxlen=self.window_size)  # 1 = agent win, 0 = agent loss
+        self.outcome_details: deque[str] = deque(maxlen=self.window_size)  # 'win', 'loss', 'draw_mutual', 'timeout'
         self.agent_asteroid_deaths: int = 0
         self.opponent_asteroid_deaths: int = 0
-        self.reward_breakdowns: list[dict] = []
+        self.reward_breakdowns: deque[dict] = deque(maxlen=self.window_size)
+        # Per-component sums over `reward_breakdowns`, and how many of its episodes carry each component
+        self._reward_sums: dict[str, float] = {}
+        self._reward_key_counts: dict[str, int] = {}
+        self.episodes: int = 0
+        self._win_sum: int = 0  # wins currently in `outcomes`
         self.should_promote: bool = False
 
-        self._last_print_time: float = 0.0
-
     def _outcome_breakdown(self, window: Optional[int] = None) -> dict[str, float]:
         """Return outcome percentages over the last `window` episodes."""
         details = self.outcome_details
@@ -105,8 +283,8 @@ class WinRateCallback(BaseCallback):
             return {"win": 0.0, "loss": 0.0, "draw_mutual": 0.0, "timeout": 0.0}
         n = len(details)
         w = min(window, n) if window else n
-        recent = details[-w:]
-        total = len(recent)
+        recent = islice(details, n - w, None)
+        total = w
         counts: dict[str, int] = {"win": 0, "loss": 0, "draw_mutual": 0, "timeout": 0}
         for o in recent:
             if o in counts:
@@ -119,7 +297,10 @@ class WinRateCallback(BaseCallback):
             return None
         n = len(self.reward_breakdowns)
         w = min(window, n) if window else n
-        recent = self.reward_breakdowns[-w:]
+        if w == n:
+            # Whole window: answer from the running sums
+            return {k: round(total / n, 6) for k, total in self._reward_sums.items() if self._reward_key_counts[k]}
+        recent = list(islice(self.reward_breakdowns, n - w, None))
         keys = recent[0].keys()
         avg: dict[str, float] = {}
         for k in keys:
@@ -127,26 +308,36 @@ class WinRateCallback(BaseCallback):
             avg[k] = round(total / len(recent), 6)
         return avg
 
+    def _record_reward_breakdown(self, rb: dict) -> None:
+        sums = self._reward_sums
+        counts = self._reward_key_counts
+        if len(self.reward_breakdowns) == self.window_size:
+            for k, v in self.reward_breakdowns[0].items():
+                sums[k] -= float(v)
+                counts[k] -= 1
+        self.reward_breakdowns.append(rb)
+        for k, v in rb.items():
+            sums[k] = sums.get(k, 0.0) + float(v)
+            counts[k] = counts.get(k, 0) + 1
+
     def _rolling_win_rate(self) -> Optional[float]:
         n = len(self.outcomes)
         if n == 0:
             return None
-        recent = self.outcomes[-min(self.window_size, n) :]
-        return float(sum(recent) / len(recent))
+        return self._win_sum / n
 
-    def _maybe_print_progress(self) -> None:
-        if self.verbose <= 0:
-            return
+    def _record_outcome(self, win: int) -> None:
+        if len(self.outcomes) == self.window_size:
+            self._win_sum -= self.outcomes[0]
+        self.outcomes.append(win)
+        self._win_sum += win
+        self.episodes += 1
 
-        now = time.time()
-        if self._last_print_time == 0.0:
-            self._last_print_time = now
-            return
-        if now - self._last_print_time < self.print_every_seconds:
+    def _print_progress(self) -> None:
+        if self.verbose <= 0:
             return
-        self._last_print_time = now
 
-        n = len(self.outcomes)
+        n = self.episodes
         wr = self._rolling_win_rate()
         remaining = max(0, self.min_episodes - n)
         steps = int(getattr(self, "num_timesteps", 0))
@@ -167,61 +358,43 @@ class WinRateCallback(BaseCallback):
             f"  ast_deaths={self.agent_asteroid_deaths}"
         )
 
-    def _on_step(self) -> bool:
-        dones = self.locals.get("dones", None)
-        infos = self.locals.get("infos", None)
-
+    def _record_dones(self, dones, infos) -> None:
+        """Record the outcome of every env that finished this step, then re-check promotion."""
         if dones is not None and infos is not None:
-            for done, info in zip(dones, infos):
-                if not done:
-                    continue
-
+            # Only visit the envs that finished; usually none or one per step
+            for i in np.flatnonzero(np.asarray(dones, dtype=bool)):
+                info = infos[i]
                 terminal_info = info.get("terminal_info", info)
-                winner = terminal_info.get("winner", None)
+                get = terminal_info.get
+                winner = get("winner", None)
                 if winner is None:
                     continue
 
-                self.outcomes.append(1 if winner == "agent" else 0)
-
-                # Structured outcome tracking
-                if winner == "agent":
-                    self.outcome_details.append("win")
-                elif winner == "draw_mutual":
-                    self.outcome_details.append("draw_mutual")
-                elif winner == "timeout":
-                    self.outcome_details.append("timeout")
-                else:
-                    self.outcome_details.append("loss")
+                self._record_outcome(self._WINNER_IS_WIN.get(winner, 0))
+                self.outcome_details.append(self._WINNER_TO_LABEL.get(winner, "loss"))
 
                 # Track reward breakdown
-                rb = terminal_info.get("rewardBreakdown", None)
+                rb = get("rewardBreakdown", None)
                 if rb is not None and isinstance(rb, dict):
-                    self.reward_breakdowns.append(rb)
+                    self._record_reward_breakdown(rb)
 
                 # Track asteroid deaths
-                agent_cause = terminal_info.get("agentDeathCause", None)
-                opponent_cause = terminal_info.get("opponentDeathCause", None)
-                if agent_cause == "asteroid":
-                    self.agent_asteroid_deaths += 1
-                if opponent_cause == "asteroid":
-                    self.opponent_asteroid_deaths += 1
+                self.agent_asteroid_deaths += get("agentDeathCause", None) == "asteroid"
+                self.opponent_asteroid_deaths += get("opponentDeathCause", None) == "asteroid"
 
-        n = len(self.outcomes)
-        if n >= max(self.window_size, self.min_episodes):
-            recent = self.outcomes[-self.window_size :]
-            win_rate = sum(recent) / len(recent)
+        if self.episodes >= max(self.window_size, self.min_episodes):
+            win_rate = self._win_sum / len(self.outcomes)
             if win_rate >= self.promotion_threshold:
                 self.should_promote = True
 
-        self._maybe_print_progress()
-        return True
-
 
-class ConfigReloadCallback(BaseCallback):
+class ConfigReloadCallback(DrivenCallback):
     """
     Hot-reloads config.yaml when the file changes on disk.
 
-    Checks file mtime every `check_every_seconds`. On change, reloads and updates:
+    A daemon watcher thread checks the file mtime every `check_every_seconds`
+    and, on change, parses it and queues the new values. The training thread
+    only checks whether anything is queued, then updates:
     - WinRateCallback.promotion_threshold (from current stage config)
     - model.learning_rate (from ppo config)
     """
@@ -238,48 +411,71 @@ class ConfigReloadCallback(BaseCallback):
         self.stage_num = stage_num
         self.win_cb = win_cb
         self.check_every_seconds = check_every_seconds
-        self._last_check_time: float = 0.0
         self._last_mtime: float = os.path.getmtime(config_path)
 
-    def _on_step(self) -> bool:
-        now = time.time()
-        if now - self._last_check_time < self.check_every_seconds:
-            return True
-        self._last_check_time = now
+        # Written by the watcher thread, drained by the training thread
+        self._pending: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = threading.Thread(target=self._watch_loop, name="config-reload", daemon=True)
+        self._watcher.start()
+
+    def close(self) -> None:
+        self._stop_event.set()
 
+    def _watch_loop(self) -> None:
+        while not self._stop_event.wait(self.check_every_seconds):
+            self._check_reload()
+
+    def _check_reload(self) -> None:
+        """Queue config.yaml's values if the file was modified since the last check."""
         try:
             mtime = os.path.getmtime(self.config_path)
         except OSError:
-            return True
+            return
 
         if mtime <= self._last_mtime:
-            return True
+            return
         self._last_mtime = mtime
 
         try:
             config = load_config(self.config_path)
-            changes = []
+            pending = {}
 
             stage_cfg = config.get("stages", {}).get(self.stage_num, {})
-            new_threshold = float(stage_cfg.get("promotionThreshold", self.win_cb.promotion_threshold))
-            if new_threshold != self.win_cb.promotion_threshold:
-                old = self.win_cb.promotion_threshold
-                self.win_cb.promotion_threshold = new_threshold
-                changes.append(f"promotionThreshold: {old:.0%} → {new_threshold:.0%}")
+            if "promotionThreshold" in stage_cfg:
+                pending["promotion_threshold"] = float(stage_cfg["promotionThreshold"])
 
             ppo_cfg = config.get("ppo", {})
-            new_lr = float(ppo_cfg.get("learning_rate", self.model.learning_rate))
-            if new_lr != self.model.learning_rate:
-                old_lr = self.model.learning_rate
-                self.model.learning_rate = new_lr
-                changes.append(f"learning_rate: {old_lr} → {new_lr}")
-
-            if changes:
-                print(f"  [CONFIG RELOAD] {', '.join(changes)}")
+            if "learning_rate" in ppo_cfg:
+                pending["learning_rate"] = float(ppo_cfg["learning_rate"])
         except Exception as e:
             print(f"  [CONFIG RELOAD] Failed to reload: {e}")
+            return
 
-        return True
+        with self._lock:
+            self._pending.update(pending)
+
+    def _apply_pending(self) -> None:
+        """Apply queued config values on the training thread."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        changes = []
+
+        new_threshold = pending.get("promotion_threshold", self.win_cb.promotion_threshold)
+        if new_threshold != self.win_cb.promotion_threshold:
+            old = self.win_cb.promotion_threshold
+            self.win_cb.promotion_threshold = new_threshold
+            changes.append(f"promotionThreshold: {old:.0%} → {new_threshold:.0%}")
+
+        new_lr = pending.get("learning_rate", self.model.learning_rate)
+        if new_lr != self.model.learning_rate:
+            old_lr = self.model.learning_rate
+            self.model.learning_rate = new_lr
+            changes.append(f"learning_rate: {old_lr} → {new_lr}")
+
+        if changes:
+            print(f"  [CONFIG RELOAD] {', '.join(changes)}")
 
 
 class StopOnPromotionCallback(BaseCallback):
@@ -293,7 +489,7 @@ class StopOnPromotionCallback(BaseCallback):
         return not self.win_cb.should_promote
 
 
-class MetricsCallback(BaseCallback):
+class MetricsCallback(DrivenCallback):
     """
     Periodic lightweight feedback. Does not rely on Monitor.
 
@@ -302,50 +498,62 @@ class MetricsCallback(BaseCallback):
     - mean reward over last N steps (from `rewards` in locals if present)
     """
 
-    def __init__(self, print_every_seconds: float = 10.0, verbose: int = 0):
+    def __init__(self, verbose: int = 0):
         super().__init__(verbose)
-        self.print_every_seconds = float(print_every_seconds)
-        self._last_print_time: float = 0.0
-        self._recent_rewards: list[float] = []
+        # Ring buffer over the last REWARD_HISTORY per-env step rewards
+        self._reward_ring = np.zeros(REWARD_HISTORY, dtype=np.float32)
+        self._ring_idx: int = 0  # next slot to write
+        self._ring_count: int = 0
 
-    def _on_step(self) -> bool:
+    def _record_rewards(self, rewards) -> None:
+        if rewards is None:
+            return
+        # rewards is typically an np.ndarray of shape (n_envs,)
+        r = np.asarray(rewards, dtype=np.float32).ravel()
+        ring = self._reward_ring
+        cap = ring.shape[0]
+        if r.shape[0] > cap:
+            r = r[-cap:]
+        k = r.shape[0]
+        idx = self._ring_idx
+        end = idx + k
+        if end <= cap:
+            ring[idx:end] = r
+        else:
+            split = cap - idx
+            ring[idx:] = r[:split]
+            ring[: end - cap] = r[split:]
+        self._ring_idx = end % cap
+        self._ring_count = min(self._ring_count + k, cap)
+
+    def recent_rewards(self, n: int = 200) -> np.ndarray:
+        """Return up to the last `n` recorded step rewards, oldest first."""
+        n = min(n, self._ring_count)
+        start = self._ring_idx - n
+        if start >= 0:
+            return self._reward_ring[start : self._ring_idx]
+        return np.concatenate((self._reward_ring[start:], self._reward_ring[: self._ring_idx]))
+
+    def _print_metrics(self) -> None:
         if self.verbose <= 0:
-            return True
-
-        rewards = self.locals.get("rewards", None)
-        if rewards is not None:
-            try:
-                # rewards is typically an np.ndarray of shape (n_envs,)
-                self._recent_rewards.extend([float(r) for r in rewards])
-                if len(self._recent_rewards) > 2000:
-                    self._recent_rewards = self._recent_rewards[-2000:]
-            except Exception:
-                pass
-
-        now = time.time()
-        if self._last_print_time == 0.0:
-            self._last_print_time = now
-            return True
-        if now - self._last_print_time < self.print_every_seconds:
-            return True
-        self._last_print_time = now
-
+            return
         steps = int(getattr(self, "num_timesteps", 0))
-        if self._recent_rewards:
-            tail = self._recent_rewards[-min(200, len(self._recent_rewards)) :]
-            print(f"  [METRICS] steps={steps}  mean_step_reward(last {len(tail)})={np.mean(tail):.4f}")
+        tail = self.recent_rewards(200)
+        if tail.size:
+            print(f"  [METRICS] steps={steps}  mean_step_reward(last {tail.size})={tail.mean(dtype=np.float64):.4f}")
         else:
             print(f"  [METRICS] steps={steps}")
-        return True
 
 
-class BestModelCallback(BaseCallback):
+class BestModelCallback(DrivenCallback):
     """
     Saves the best model checkpoint based on rolling win rate.
 
     Reads from an existing WinRateCallback (no duplicate episode counting).
     Every `check_every` episodes, checks if rolling win rate exceeds the best
     seen so far. If yes, saves best.zip + best_meta.json to checkpoint_dir.
+    The model is serialized in memory here; the files are written on the
+    background I/O thread.
     """
 
     def __init__(self, win_cb: WinRateCallback, checkpoint_dir: str, check_every: int = 50):
@@ -356,12 +564,13 @@ class BestModelCallback(BaseCallback):
         self.best_win_rate: float = 0.0
         self._last_checked_episodes: int = 0
 
-    def _on_step(self) -> bool:
-        n = len(self.win_cb.outcomes)
+    def _check_best(self) -> None:
+        """Save best.zip if the rolling win rate beat the best so far (every check_every episodes)."""
+        n = self.win_cb.episodes
         if n < self.win_cb.window_size:
-            return True
+            return
         if n - self._last_checked_episodes < self.check_every:
-            return True
+            return
 
         self._last_checked_episodes = n
         wr = self.win_cb._rolling_win_rate()
@@ -369,7 +578,9 @@ class BestModelCallback(BaseCallback):
             self.best_win_rate = wr
             os.makedirs(self.checkpoint_dir, exist_ok=True)
             best_path = os.path.join(self.checkpoint_dir, "best.zip")
-            self.model.save(best_path)
+            buf = io.BytesIO()
+            self.model.save(buf)
+            _submit_io(_write_bytes, best_path, buf.getvalue())
 
             meta = {
                 "win_rate": wr,
@@ -378,20 +589,19 @@ class BestModelCallback(BaseCallback):
                 "timestamp": time.time(),
             }
             meta_path = os.path.join(self.checkpoint_dir, "best_meta.json")
-            with open(meta_path, "w") as f:
-                json.dump(meta, f, indent=2)
+            _submit_io(_write_bytes, meta_path, _json_dumps(meta, indent=True))
 
             print(f"  [BEST] New best model! win_rate={wr:.1%} step={self.num_timesteps} episode={n}")
 
-        return True
-
 
-class JsonLogCallback(BaseCallback):
+class JsonLogCallback(DrivenCallback):
     """
     Appends training metrics as JSONL and rewrites a JS data file for the dashboard.
 
-    Logs at the same cadence as console prints (~every print_every_seconds).
+    FusedTrainingCallback writes an entry at the same cadence as console prints.
     On startup, loads existing JSONL entries so data persists across restarts.
+    The dashboard file only carries the last DASHBOARD_MAX_ENTRIES entries and
+    is replaced atomically, so the page never loads a half-written file.
     """
 
     def __init__(
@@ -401,7 +611,6 @@ class JsonLogCallback(BaseCallback):
         best_cb: BestModelCallback,
         stage_num: int,
         log_dir: str,
-        print_every_seconds: float = 10.0,
     ):
         super().__init__(verbose=0)
         self.win_cb = win_cb
@@ -409,9 +618,8 @@ class JsonLogCallback(BaseCallback):
         self.best_cb = best_cb
         self.stage_num = stage_num
         self.log_dir = log_dir
-        self.print_every_seconds = print_every_seconds
-        self._last_log_time: float = 0.0
-        self._entries: list[dict] = []
+        # Entries are kept serialized, so a dashboard rewrite is one join, not a re-encode
+        self._entries: deque[bytes] = deque(maxlen=DASHBOARD_MAX_ENTRIES)
 
         os.makedirs(log_dir, exist_ok=True)
         self._jsonl_path = os.path.join(log_dir, f"stage{stage_num}.jsonl")
@@ -419,29 +627,25 @@ class JsonLogCallback(BaseCallback):
 
         # Load existing entries on startup
         if os.path.exists(self._jsonl_path):
-            with open(self._jsonl_path, "r") as f:
+            with open(self._jsonl_path, "rb") as f:
                 for line in f:
                     line = line.strip()
                     if line:
                         try:
-                            self._entries.append(json.loads(line))
-                        except json.JSONDecodeError:
-                            pass
-
-    def _on_step(self) -> bool:
-        now = time.time()
-        if self._last_log_time == 0.0:
-            self._last_log_time = now
-            return True
-        if now - self._last_log_time < self.print_every_seconds:
-            return True
-        self._last_log_time = now
-
+                            _json_loads(line)
+                        except ValueError:
+                            continue
+                        self._entries.append(line)
+        # Buffered; flushed when the buffer fills and on close (training end or interpreter exit)
+        self._jsonl_file = open(self._jsonl_path, "ab", buffering=JSONL_BUFFER_BYTES)
+        atexit.register(self._jsonl_file.close)
+
+    def _write_entry(self, now: float) -> None:
+        """Append one metrics entry to the JSONL log and refresh the dashboard data file."""
         wr = self.win_cb._rolling_win_rate()
-        recent_rewards = self.metrics_cb._recent_rewards
-        if recent_rewards:
-            tail = recent_rewards[-min(200, len(recent_rewards)):]
-            mean_reward = float(np.mean(tail))
+        tail = self.metrics_cb.recent_rewards(200)
+        if tail.size:
+            mean_reward = float(tail.mean(dtype=np.float64))
         else:
             mean_reward = 0.0
 
@@ -452,7 +656,7 @@ class JsonLogCallback(BaseCallback):
         entry = {
             "ts": now,
             "step": int(self.num_timesteps),
-            "episodes": len(self.win_cb.outcomes),
+            "episodes": self.win_cb.episodes,
             "win_rate": round(wr, 4) if wr is not None else None,
             "mean_reward": round(mean_reward, 4),
             "best_wr": round(self._get_best_wr(), 4),
@@ -463,24 +667,108 @@ class JsonLogCallback(BaseCallback):
             "opponent_asteroid_deaths": self.win_cb.opponent_asteroid_deaths,
             "reward_breakdown": reward_breakdown,
         }
-        self._entries.append(entry)
+        encoded = _json_dumps(entry)
+        self._entries.append(encoded)
 
-        # Append to JSONL
-        with open(self._jsonl_path, "a") as f:
-            f.write(json.dumps(entry) + "\n")
-
-        # Rewrite JS data file for dashboard
-        self._write_dashboard_js()
-
-        return True
+        # Append to JSONL and rewrite the dashboard's JS data file, both off-thread
+        _submit_io(self._append_line, encoded + b"\n")
+        _submit_io(self._write_dashboard_js, tuple(self._entries))
 
     def _get_best_wr(self) -> float:
         return self.best_cb.best_win_rate
 
-    def _write_dashboard_js(self) -> None:
-        with open(self._js_path, "w") as f:
-            f.write("// Auto-generated by train_v3.py — do not edit\n")
-            f.write(f"var DASHBOARD_DATA = {json.dumps(self._entries)};\n")
+    def _append_line(self, line: bytes) -> None:
+        self._jsonl_file.write(line)
+
+    def _write_dashboard_js(self, entries: tuple[bytes, ...]) -> None:
+        tmp_path = self._js_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_DASHBOARD_PREFIX)
+            f.write(b"[" + b",".join(entries) + b"];\n")
+        os.replace(tmp_path, self._js_path)
+
+    def close(self) -> None:
+        # Queued behind any pending writes to the same handle
+        _submit_io(self._jsonl_file.close)
+        atexit.unregister(self._jsonl_file.close)
+
+
+class FusedTrainingCallback(BaseCallback):
+    """
+    Runs the win-rate, metrics, best-model, JSON-log and config-reload callbacks
+    from a single `_on_step`.
+
+    SB3 calls `_on_step` on every callback in the list once per env step. Here the
+    done/reward scan happens once, best.zip is only considered on steps where an
+    episode ended, the clock is read every CLOCK_CHECK_MASK + 1 steps to check the
+    next print / log deadline, and config reloads are applied only once the watcher
+    has queued one.
+    The wrapped callbacks are DrivenCallbacks: they keep all state and are never
+    registered with SB3 themselves, so the end-of-stage code reads them directly.
+    """
+
+    def __init__(
+        self,
+        win_cb: WinRateCallback,
+        metrics_cb: MetricsCallback,
+        best_cb: BestModelCallback,
+        json_log_cb: JsonLogCallback,
+        config_cb: Optional[ConfigReloadCallback] = None,
+        print_every_seconds: float = 10.0,
+    ):
+        super().__init__(verbose=0)
+        self.win_cb = win_cb
+        self.metrics_cb = metrics_cb
+        self.best_cb = best_cb
+        self.json_log_cb = json_log_cb
+        self.config_cb = config_cb
+        self.print_every_seconds = float(print_every_seconds)
+
+        self._periodic = (win_cb, metrics_cb, best_cb, json_log_cb)
+        self._next_print_time: float = 0.0
+
+    def _init_callback(self) -> None:
+        for cb in (*self._periodic, self.config_cb):
+            if cb is not None:
+                cb.init_callback(self.model)
+
+    def _on_training_start(self) -> None:
+        self._next_print_time = time.time() + self.print_every_seconds
+
+    def _on_training_end(self) -> None:
+        self.json_log_cb.close()
+        if self.config_cb is not None:
+            self.config_cb.close()
+
+    def _sync(self, cb: BaseCallback) -> None:
+        # Wrapped callbacks never go through on_step(), so hand them the counters
+        cb.n_calls = self.n_calls
+        cb.num_timesteps = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        dones = self.locals.get("dones", None)
+        self.win_cb._record_dones(dones, self.locals.get("infos", None))
+        self.metrics_cb._record_rewards(self.locals.get("rewards", None))
+        if dones is not None and dones.any():
+            self._sync(self.best_cb)
+            self.best_cb._check_best()
+
+        if not self.n_calls & CLOCK_CHECK_MASK:
+            self._maybe_print(time.time())
+
+        if self.config_cb is not None and self.config_cb._pending:
+            self.config_cb._apply_pending()
+
+        return True
+
+    def _maybe_print(self, now: float) -> None:
+        if now >= self._next_print_time:
+            self._next_print_time = now + self.print_every_seconds
+            for cb in self._periodic:
+                self._sync(cb)
+            self.win_cb._print_progress()
+            self.metrics_cb._print_metrics()
+            self.json_log_cb._write_entry(now)
 
 
 def save_meta(
@@ -493,6 +781,7 @@ def save_meta(
     outcomes: list[int],
     window_size: int,
     min_episodes: int,
+    episodes: Optional[int] = None,
 ) -> str:
     if outcomes:
         recent = outcomes[-min(window_size, len(outcomes)) :]
@@ -507,18 +796,85 @@ def save_meta(
         "ppo_config": ppo_cfg,
         "promotion_threshold": promotion_threshold,
         "timesteps_budget": timesteps_budget,
-        "episodes_counted": len(outcomes),
+        "episodes_counted": len(outcomes) if episodes is None else episodes,
         "rolling_win_rate": rolling,
         "window_size": window_size,
         "min_episodes_before_promote": min_episodes,
     }
 
     meta_path = os.path.join(checkpoint_dir, "meta.json")
-    with open(meta_path, "w") as f:
-        json.dump(meta, f, indent=2)
+    _write_bytes(meta_path, _json_dumps(meta, indent=True))
     return meta_path
 
 
+def make_vec_env(
+    env_config: dict,
+    num_envs: int,
+    node_executable: str,
+    simulate_path: Optional[str],
+    vec: str = "subproc",
+    envs_per_worker: int = 1,
+):
+    """
+    Create the vectorized environment for one stage.
+
+    envs_per_worker > 1 groups that many envs into each worker process, stepped
+    one after another (shmem workers only; it implies vec="shmem"). A step then
+    waits on the slowest group rather than the slowest env, and since the sum
+    of k step times varies less than any one of them, the straggler wait moves
+    toward the mean (Accelerated Methods for Deep RL, Stooke & Abbeel).
+    """
+    if vec == "batched":
+        # All games in one Node process, stepped by a single batch command
+        return BatchedSpaceDogfightVecEnv(
+            num_envs, env_config, node_executable=node_executable, simulate_path=simulate_path
+        )
+
+    env_fns = [
+        make_env(env_config, node_executable=node_executable, simulate_path=simulate_path)
+        for _ in range(num_envs)
+    ]
+
+    if num_envs > 1:
+        if vec == "shmem" or envs_per_worker > 1:
+            # Observations, rewards and dones come back through shared memory
+            return ShmemVecEnv(env_fns, envs_per_worker=envs_per_worker)
+        return SubprocVecEnv(env_fns)
+
+    from stable_baselines3.common.vec_env import DummyVecEnv
+
+    return DummyVecEnv(env_fns)
+
+
+def rollout_n_steps(ppo_cfg: dict, num_envs: int) -> int:
+    """
+    Per-env n_steps for PPO.
+
+    If ppo_cfg sets `target_rollout`, that total rollout size is split across
+    the envs, so adding envs shortens each env's rollout while batch_size (and
+    with it the number of minibatches per epoch) stays the same. Keeping the
+    learning rate and minibatch size fixed as envs scale is the stable recipe
+    for PPO; growing the buffer per env is not. Without the key, n_steps is
+    used as-is, as before.
+
+    Raises ValueError unless target_rollout splits evenly into num_envs rollouts
+    and into whole minibatches, so the rollout PPO collects is exactly the one
+    the config asked for.
+    """
+    target_rollout = ppo_cfg.get("target_rollout", None)
+    if target_rollout is None:
+        return int(ppo_cfg.get("n_steps", 2048))
+    target_rollout = int(target_rollout)
+    if target_rollout < num_envs:
+        raise ValueError(f"target_rollout ({target_rollout}) is smaller than num_envs ({num_envs})")
+    if target_rollout % num_envs:
+        raise ValueError(f"target_rollout ({target_rollout}) is not divisible by num_envs ({num_envs})")
+    batch_size = ppo_cfg.get("batch_size", 64)
+    if target_rollout % batch_size:
+        raise ValueError(f"target_rollout ({target_rollout}) is not a multiple of batch_size ({batch_size})")
+    return target_rollout // num_envs
+
+
 def train_stage(
     config: dict,
     stage_num: int,
@@ -533,73 +889,62 @@ def train_stage(
     progress_print_seconds: float,
     window_size: int = 200,
     config_path: Optional[str] = None,
+    vec: str = "subproc",
+    envs_per_worker: int = 1,
+    torch_threads: Optional[int] = None,
 ) -> tuple[str, bool]:
     stage_cfg = get_stage_config(config, stage_num)
     ppo_cfg = config.get("ppo", {})
     promotion_threshold = float(stage_cfg.get("promotionThreshold", 0.8))
 
-    env_config = {
-        k: stage_cfg[k]
-        for k in (
-            "shipHP",
-            "enemyHP",
-            "maxTicks",
-            "asteroidDensity",
-            "enemyPolicy",
-            "enemyShoots",
-            "spawnDistance",
-            "spawnFacing",
-            "rewardWeights",
-            "frameSkip",
-            "aiHoldTime",
-            "aiSimSteps",
-            "aiMaxSpeedFactor",
-            "selfPlayModelPath",
-            "evasionWaypointRadius",
-            "evasionArrivalDist",
-            "evasionMaxHoldTime",
-            "evasionCandidates",
-            "evasionSpeedFactor",
-            "enemyFireCooldown",
-            "campCheckTicks",
-            "campMinClosing",
-        )
-        if k in stage_cfg
-    }
+    env_config = {k: stage_cfg[k] for k in _ENV_CONFIG_KEYS if k in stage_cfg}
+
+    if vec == "subproc" and envs_per_worker > 1:
+        vec = "shmem"  # only shmem workers can host several envs
+    n_steps = rollout_n_steps(ppo_cfg, num_envs)
+    batch_size = ppo_cfg.get("batch_size", 64)
+    rollout_size = n_steps * num_envs
+
+    # Leave a core per Node.js simulator (one in total when batched) rather than
+    # letting torch claim every core and oversubscribe the CPU with the env workers.
+    import torch
+
+    if torch_threads is None:
+        node_procs = 1 if vec == "batched" else num_envs
+        torch_threads = max(1, (os.cpu_count() or 4) - node_procs)
+    torch.set_num_threads(torch_threads)
 
     print("\n" + "=" * 60)
     print(f"Stage {stage_num}: {stage_cfg.get('description', '')}")
-    print(f"  Envs: {num_envs}  Timesteps budget: {timesteps}  Early-stop: {early_stop}")
+    print(
+        f"  Envs: {num_envs} ({vec}, {envs_per_worker}/worker)  Timesteps budget: {timesteps}  Early-stop: {early_stop}"
+    )
     print(f"  Promotion threshold: {promotion_threshold:.0%}  Min episodes: {min_episodes_before_promote}  Window: {window_size}")
-    print(f"  Progress print: every {progress_print_seconds:.0f}s")
+    print(
+        f"  Rollout: {num_envs} envs x {n_steps} steps = {rollout_size}"
+        f"  batch_size={batch_size}  minibatches/epoch={max(1, rollout_size // batch_size)}"
+    )
+    print(f"  Torch threads: {torch_threads}  Progress print: every {progress_print_seconds:.0f}s")
     print(f"  Config: {env_config}")
     print("=" * 60 + "\n")
 
-    env_fns = [
-        make_env(env_config, rank=i, node_executable=node_executable, simulate_path=simulate_path)
-        for i in range(num_envs)
-    ]
-
-    if num_envs > 1:
-        vec_env = SubprocVecEnv(env_fns)
-    else:
-        from stable_baselines3.common.vec_env import DummyVecEnv
-
-        vec_env = DummyVecEnv(env_fns)
+    vec_env = make_vec_env(env_config, num_envs, node_executable, simulate_path, vec, envs_per_worker)
 
     policy_kwargs = build_policy_kwargs(config)
 
     if checkpoint_path and os.path.exists(checkpoint_path):
         print(f"  Loading checkpoint: {checkpoint_path}")
-        model = PPO.load(checkpoint_path, env=vec_env)
+        # The checkpoint's own n_steps is kept unless a target rollout is configured
+        load_kwargs = {"n_steps": n_steps} if "target_rollout" in ppo_cfg else {}
+        model = PPO.load(checkpoint_path, env=vec_env, **load_kwargs)
         model.learning_rate = ppo_cfg.get("learning_rate", 3e-4)
     else:
         model = PPO(
             "MlpPolicy",
             vec_env,
             learning_rate=ppo_cfg.get("learning_rate", 3e-4),
-            n_steps=ppo_cfg.get("n_steps", 2048),
-            batch_size=ppo_cfg.get("batch_size", 64),
+            n_steps=n_steps,
+            batch_size=batch_size,
             n_epochs=ppo_cfg.get("n_epochs", 10),
             gamma=ppo_cfg.get("gamma", 0.99),
             gae_lambda=ppo_cfg.get("gae_lambda", 0.95),
@@ -611,14 +956,17 @@ def train_stage(
             verbose=0,
         )
 
+    accelerations = accelerate_policy(model, ppo_cfg)
+    if accelerations:
+        print(f"  Policy acceleration: {', '.join(accelerations)}")
+
     win_cb = WinRateCallback(
         window_size=window_size,
         promotion_threshold=promotion_threshold,
         min_episodes=min_episodes_before_promote,
-        print_every_seconds=progress_print_seconds,
         verbose=1,
     )
-    metrics_cb = MetricsCallback(print_every_seconds=progress_print_seconds, verbose=1)
+    metrics_cb = MetricsCallback(verbose=1)
 
     log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
     best_cb = BestModelCallback(win_cb=win_cb, checkpoint_dir=checkpoint_dir)
@@ -628,18 +976,26 @@ def train_stage(
         best_cb=best_cb,
         stage_num=stage_num,
         log_dir=log_dir,
+    )
+
+    config_cb = ConfigReloadCallback(config_path, stage_num, win_cb) if config_path else None
+    fused_cb = FusedTrainingCallback(
+        win_cb=win_cb,
+        metrics_cb=metrics_cb,
+        best_cb=best_cb,
+        json_log_cb=json_log_cb,
+        config_cb=config_cb,
         print_every_seconds=progress_print_seconds,
     )
 
-    callbacks: list[BaseCallback] = [win_cb, metrics_cb, best_cb, json_log_cb]
-    if config_path:
-        callbacks.append(ConfigReloadCallback(config_path, stage_num, win_cb))
+    callbacks: list[BaseCallback] = [fused_cb]
     if early_stop:
         callbacks.append(StopOnPromotionCallback(win_cb))
 
     start_time = time.time()
     model.learn(total_timesteps=timesteps, callback=callbacks)
     elapsed = time.time() - start_time
+    flush_io()
 
     os.makedirs(checkpoint_dir, exist_ok=True)
     final_path = os.path.join(checkpoint_dir, "final.zip")
@@ -652,16 +1008,16 @@ def train_stage(
         ppo_cfg=ppo_cfg,
         promotion_threshold=promotion_threshold,
         timesteps_budget=timesteps,
-        outcomes=win_cb.outcomes,
+        outcomes=list(win_cb.outcomes),
         window_size=window_size,
         min_episodes=min_episodes_before_promote,
+        episodes=win_cb.episodes,
     )
 
     print(f"\n  Stage {stage_num} complete in {elapsed:.1f}s")
-    print(f"  Episodes counted: {len(win_cb.outcomes)}")
+    print(f"  Episodes counted: {win_cb.episodes}")
     if win_cb.outcomes:
-        recent = win_cb.outcomes[-min(window_size, len(win_cb.outcomes)) :]
-        print(f"  Rolling win rate (last {len(recent)}): {sum(recent)/len(recent):.1%}")
+        print(f"  Rolling win rate (last {len(win_cb.outcomes)}): {win_cb._rolling_win_rate():.1%}")
     print(f"  Checkpoint saved: {final_path}")
     print(f"  Meta saved: {meta_path}")
 
@@ -681,6 +1037,27 @@ def parse_args():
     )
     parser.add_argument("--checkpoint", type=str, default=None, help="Path to a saved model to resume from")
     parser.add_argument("--num-envs", type=int, default=4, help="Number of parallel environments")
+    parser.add_argument(
+        "--vec",
+        choices=["subproc", "shmem", "batched"],
+        default="subproc",
+        help=(
+            "Vectorization: one subprocess per env, the same with step results returned through shared memory,"
+            " or all envs batched in a single Node process"
+        ),
+    )
+    parser.add_argument(
+        "--envs-per-worker",
+        type=int,
+        default=1,
+        help="Envs stepped sequentially by each worker process (values above 1 use shmem workers)",
+    )
+    parser.add_argument(
+        "--torch-threads",
+        type=int,
+        default=None,
+        help="Intra-op threads for the policy (default: cpu_count minus one per Node process, at least 1)",
+    )
     parser.add_argument("--config", type=str, default=None, help="Path to config.yaml")
     parser.add_argument("--auto-promote", action="store_true", help="Automatically promote through curriculum stages")
     parser.add_argument("--early-stop", action="store_true", help="Stop a stage as soon as promotion threshold is met")
@@ -714,14 +1091,21 @@ def parse_args():
 
 def main():
     args = parse_args()
+    here = os.path.dirname(os.path.abspath(__file__))
+    checkpoint_root = os.path.join(here, "checkpoints")
 
     if args.config:
         config_path = args.config
     else:
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+        config_path = os.path.join(here, "config.yaml")
 
     config = load_config(config_path)
 
+    # Inter-op threads can only be set once per process, before any parallel work
+    import torch
+
+    torch.set_num_interop_threads(1)
+
     if args.episodes is not None and args.timesteps is not None:
         print("Error: --episodes and --timesteps are mutually exclusive", file=sys.stderr)
         sys.exit(1)
@@ -739,11 +1123,7 @@ def main():
         checkpoint = args.checkpoint
         max_stage = max(config["stages"].keys())
         for stage_num in range(args.stage, max_stage + 1):
-            checkpoint_dir = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)),
-                "checkpoints",
-                f"stage{stage_num}",
-            )
+            checkpoint_dir = os.path.join(checkpoint_root, f"stage{stage_num}")
             final_path, promoted = train_stage(
                 config=config,
                 stage_num=stage_num,
@@ -758,6 +1138,9 @@ def main():
                 progress_print_seconds=args.progress_print_seconds,
                 window_size=args.window_size,
                 config_path=config_path,
+                vec=args.vec,
+                envs_per_worker=args.envs_per_worker,
+                torch_threads=args.torch_threads,
             )
             checkpoint = final_path
 
@@ -765,10 +1148,7 @@ def main():
                 print(f"\n  Promoted to stage {stage_num + 1}!")
                 # Export self-play snapshot when graduating to a self-play stage
                 if stage_num + 1 in (10, 12, 13):
-                    snapshot_dir = os.path.join(
-                        os.path.dirname(os.path.abspath(__file__)),
-                        "checkpoints", "selfplay",
-                    )
+                    snapshot_dir = os.path.join(checkpoint_root, "selfplay")
                     os.makedirs(snapshot_dir, exist_ok=True)
                     snapshot_path = os.path.join(snapshot_dir, "opponent_snapshot.onnx")
                     from export_onnx import export_onnx
@@ -780,11 +1160,7 @@ def main():
                     print("  Stopping (use --continue-all-stages to force running later stages).")
                     break
     else:
-        checkpoint_dir = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            "checkpoints",
-            f"stage{args.stage}",
-        )
+        checkpoint_dir = os.path.join(checkpoint_root, f"stage{args.stage}")
         train_stage(
             config=config,
             stage_num=args.stage,
@@ -799,6 +1175,9 @@ def main():
             progress_print_seconds=args.progress_print_seconds,
             window_size=args.window_size,
             config_path=config_path,
+            vec=args.vec,
+            envs_per_worker=args.envs_per_worker,
+            torch_threads=args.torch_threads,
         )
 
 
@@ -0,0 +1,386 @@
+"""Vectorized environment wrappers for the Node.js-backed ``SpaceDogfightEnv``."""
+
+import multiprocessing as mp
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv
+
+from env import BATCH_HEADER, OP_STEP, OP_STEP_BATCH, BridgeProcess, make_spaces, unpack_step_header
+
+
+def _shared_layout(n_envs, observation_space, action_space):
+    """``(shape, dtype, offset)`` of the shared obs/reward/done/action arrays, and the total size.
+
+    The arrays sit back to back in one shared memory block, each aligned for its dtype.
+    """
+    specs = [
+        ((n_envs, *observation_space.shape), observation_space.dtype),
+        ((n_envs,), np.float32),
+        ((n_envs,), bool),
+        ((n_envs, *action_space.shape), action_space.dtype),
+    ]
+    layout = []
+    offset = 0
+    for shape, dtype in specs:
+        dtype = np.dtype(dtype)
+        offset = -(-offset // dtype.alignment) * dtype.alignment
+        layout.append((shape, dtype, offset))
+        offset += int(np.prod(shape)) * dtype.itemsize
+    return layout, offset
+
+
+def _shared_arrays(buf, layout):
+    return [np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset) for shape, dtype, offset in layout]
+
+
+def _shmem_worker(remote, parent_remote, env_fn_wrapper, start):
+    """Worker loop for ``ShmemVecEnv``.
+
+    Mirrors SB3's ``SubprocVecEnv`` worker, but hosts a group of envs
+    (slots ``start`` onwards) and steps them one after another.  Actions
+    are read from, and observations, rewards and dones written into, the
+    shared arrays (announced by the parent with an ``attach`` command), so
+    a step command carries no payload and only the info dicts travel back
+    by pipe.  Every per-env command carries the local indices it applies to.
+    """
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    envs = [env_fn() for env_fn in env_fn_wrapper.var]
+    slots = range(start, start + len(envs))
+    shm = None
+    obs_array = rews = dones = actions = None
+    rows = {}  # slot -> the row view envs publish into, fixed at attach
+
+    def publish(slot, observation):
+        row = rows[slot]
+        if observation is not row:
+            row[:] = observation
+
+    reset_infos = [{} for _ in envs]
+    try:
+        while True:
+            try:
+                cmd, data = remote.recv()
+            except (EOFError, KeyboardInterrupt):
+                break
+
+            if cmd == "step":
+                infos = []
+                for local, (env, slot) in enumerate(zip(envs, slots)):
+                    observation, reward, terminated, truncated, info = env.step(actions[slot])
+                    done = terminated or truncated
+                    info["TimeLimit.truncated"] = truncated and not terminated
+                    if done:
+                        # save final observation where user can get it, then reset
+                        info["terminal_observation"] = observation
+                        observation, reset_infos[local] = env.reset()
+                    publish(slot, observation)
+                    rews[slot] = reward
+                    dones[slot] = done
+                    infos.append(info)
+                remote.send((infos, reset_infos))
+            elif cmd == "reset":
+                for local, (env, slot, (seed, options)) in enumerate(zip(envs, slots, data)):
+                    maybe_options = {"options": options} if options else {}
+                    observation, reset_infos[local] = env.reset(seed=seed, **maybe_options)
+                    publish(slot, observation)
+                remote.send(reset_infos)
+            elif cmd == "attach":
+                shm_name, n_envs = data
+                shm = shared_memory.SharedMemory(name=shm_name)
+                layout, _ = _shared_layout(n_envs, envs[0].observation_space, envs[0].action_space)
+                obs_array, rews, dones, actions = _shared_arrays(shm.buf, layout)
+                for env, slot in zip(envs, slots):
+                    if hasattr(env, "set_shared_obs_buffer"):
+                        # The env returns its row, so already-published observations are not copied again
+                        rows[slot] = env.set_shared_obs_buffer(obs_array, slot)
+                    else:
+                        rows[slot] = obs_array[slot]
+                remote.send(None)
+            elif cmd == "close":
+                for env in envs:
+                    env.close()
+                remote.close()
+                break
+            elif cmd == "get_spaces":
+                remote.send((envs[0].observation_space, envs[0].action_space))
+            elif cmd == "env_method":
+                local, (name, args, kwargs) = data
+                remote.send([envs[i].get_wrapper_attr(name)(*args, **kwargs) for i in local])
+            elif cmd == "get_attr":
+                local, name = data
+                remote.send([envs[i].get_wrapper_attr(name) for i in local])
+            elif cmd == "has_attr":
+                local, name = data
+                found = []
+                for i in local:
+                    try:
+                        envs[i].get_wrapper_attr(name)
+                        found.append(True)
+                    except AttributeError:
+                        found.append(False)
+                remote.send(found)
+            elif cmd == "set_attr":
+                local, (name, value) = data
+                remote.send([setattr(envs[i], name, value) for i in local])
+            elif cmd == "is_wrapped":
+                local, wrapper_class = data
+                remote.send([is_wrapped(envs[i], wrapper_class) for i in local])
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+    finally:
+        if shm is not None:
+            # Drop every view of the buffer before closing the mapping.
+            obs_array = rews = dones = actions = None
+            envs = None
+            shm.close()
+
+
+def default_start_method():
+    """Start method for env worker processes.
+
+    Workers only run ``SpaceDogfightEnv`` (numpy + a Node.js subprocess) and
+    never touch torch, so on Linux they are forked: no interpreter start-up
+    or re-import of torch/SB3 per worker.  Elsewhere fork is unavailable or
+    unsafe, so fall back to SB3's choice (forkserver, else spawn).
+    """
+    if sys.platform == "linux":
+        return "fork"
+    return "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+
+
+class ShmemVecEnv(SubprocVecEnv):
+    """``SubprocVecEnv`` variant that returns step results through shared memory.
+
+    Actions, observations, rewards and done flags live in
+    ``multiprocessing.shared_memory`` arrays, one slot per env: the parent
+    writes all actions with one copy, workers read their actions and write
+    their results in place, so the per-step pipe traffic is an empty step
+    command out and the info dicts back.  The parent copies the result
+    arrays once per step.
+
+    With ``envs_per_worker > 1`` each worker process hosts that many envs and
+    steps them sequentially, so a step waits on the slowest *group* rather
+    than the slowest env, and large ``num_envs`` do not need one Python
+    worker process per env.
+
+    Only ``Box`` observation spaces are supported.
+    """
+
+    def __init__(self, env_fns, start_method=None, envs_per_worker=1):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+        envs_per_worker = max(1, int(envs_per_worker))
+        self._groups = [
+            range(start, min(start + envs_per_worker, n_envs)) for start in range(0, n_envs, envs_per_worker)
+        ]
+
+        if start_method is None:
+            start_method = default_start_method()
+        ctx = mp.get_context(start_method)
+        if start_method == "fork":
+            # Start the resource tracker before the workers so forked workers
+            # share it; otherwise each starts its own and unlinks the shared
+            # observation block when it exits.  (The tracker is POSIX-only, and
+            # spawned/forkserver workers are handed the parent's tracker anyway.)
+            resource_tracker.ensure_running()
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in self._groups])
+        self.processes = []
+        for work_remote, remote, group in zip(self.work_remotes, self.remotes, self._groups):
+            group_fns = [env_fns[i] for i in group]
+            args = (work_remote, remote, CloudpickleWrapper(group_fns), group.start)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=_shmem_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(("get_spaces", None))
+        observation_space, action_space = self.remotes[0].recv()
+
+        layout, nbytes = _shared_layout(n_envs, observation_space, action_space)
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._obs_array, self._rews, self._dones, self._actions = _shared_arrays(self._shm.buf, layout)
+        for remote in self.remotes:
+            remote.send(("attach", (self._shm.name, n_envs)))
+        for remote in self.remotes:
+            remote.recv()
+
+        VecEnv.__init__(self, n_envs, observation_space, action_space)
+
+    def step_async(self, actions):
+        self._actions[:] = actions
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self):
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        infos, self.reset_infos = [], []
+        for group_infos, group_reset_infos in results:
+            infos.extend(group_infos)
+            self.reset_infos.extend(group_reset_infos)
+        return self._obs_array.copy(), self._rews.copy(), self._dones.copy(), infos
+
+    def reset(self):
+        for remote, group in zip(self.remotes, self._groups):
+            remote.send(("reset", [(self._seeds[i], self._options[i]) for i in group]))
+        self.reset_infos = [info for remote in self.remotes for info in remote.recv()]
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs_array.copy()
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        del self._obs_array, self._rews, self._dones, self._actions
+        self._shm.close()
+        self._shm.unlink()
+
+    def _call_envs(self, cmd, data, indices):
+        """Run *cmd* on the envs at *indices*; results come back in index order."""
+        indices = list(self._get_indices(indices))
+        size = len(self._groups[0])
+        targets = {}
+        for index in indices:
+            targets.setdefault(index // size, []).append(index % size)
+        for worker, local in targets.items():
+            self.remotes[worker].send((cmd, (local, data)))
+        results = {}
+        for worker, local in targets.items():
+            for i, result in zip(local, self.remotes[worker].recv()):
+                results[worker * size + i] = result
+        return [results[index] for index in indices]
+
+    def has_attr(self, attr_name):
+        return all(self._call_envs("has_attr", attr_name, None))
+
+    def get_attr(self, attr_name, indices=None):
+        return self._call_envs("get_attr", attr_name, indices)
+
+    def set_attr(self, attr_name, value, indices=None):
+        self._call_envs("set_attr", (attr_name, value), indices)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self._call_envs("env_method", (method_name, method_args, method_kwargs), indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return self._call_envs("is_wrapped", wrapper_class, indices)
+
+
+class BatchedSpaceDogfightVecEnv(VecEnv):
+    """Runs *num_envs* games inside a single Node.js bridge process.
+
+    Every ``step()`` is one batch command carrying all actions and one read of
+    ``num_envs`` fixed-size step frames, instead of a pipe round trip per
+    environment.  Finished games are reset in place (one JSON reset each),
+    matching the auto-reset semantics of the other VecEnvs.  Resets are
+    pipelined: all reset commands go out before any response is read.
+
+    All games share one stage config, so ``get_attr``/``set_attr``/
+    ``env_method`` resolve against this object for every index.
+    """
+
+    def __init__(self, num_envs, stage_config=None, node_executable="node", simulate_path=None):
+        self.render_mode = None
+        self._stage_config = stage_config or {}
+        self._bridge = BridgeProcess(node_executable, simulate_path, protocol="binary")
+
+        observation_space, action_space = make_spaces()
+        self._obs = np.zeros((num_envs, *observation_space.shape), dtype=np.float32)
+        self._rews = np.zeros(num_envs, dtype=np.float32)
+        self._dones = np.zeros(num_envs, dtype=bool)
+
+        # Batch command: fixed header, then an (N, 2) uint8 block of actions.
+        self._cmd = bytearray(BATCH_HEADER.size + 2 * num_envs)
+        BATCH_HEADER.pack_into(self._cmd, 0, OP_STEP_BATCH, num_envs)
+        self._cmd_actions = np.frombuffer(self._cmd, dtype=np.uint8, offset=BATCH_HEADER.size).reshape(num_envs, 2)
+
+        super().__init__(num_envs, observation_space, action_space)
+        self._encode_resets()
+
+    def _encode_resets(self):
+        # One pre-encoded reset command per game; rebuilt when the config changes.
+        self._reset_payloads = [
+            self._bridge.encode_command({
+                "command": "reset",
+                "config": self._stage_config,
+                "index": index,
+            })
+            for index in range(self.num_envs)
+        ]
+
+    def _reset_games(self, indices):
+        # Pipelined: every reset is written before the first response is read.
+        responses = self._bridge.send_many([self._reset_payloads[i] for i in indices])
+        for index, response in zip(indices, responses):
+            if "error" in response:
+                raise RuntimeError(f"Bridge reset error: {response['error']}")
+            self._obs[index] = response["observation"]
+
+    def reset(self):
+        self._bridge.ensure_running()
+        self._reset_games(range(self.num_envs))
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        # Seeds and options are only used once (the simulator is not seedable)
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def step_async(self, actions):
+        self._cmd_actions[:] = actions
+
+    def step_wait(self):
+        bridge = self._bridge
+        infos = []
+        opcode, info = bridge.exchange(self._cmd)
+        for index in range(self.num_envs):
+            if index:
+                opcode, info = bridge.read_frame()
+            if opcode != OP_STEP:
+                raise RuntimeError(f"Bridge step error: {info.get('error', info)}")
+            reward, terminated, truncated = unpack_step_header(bridge.frame_buf)
+            self._rews[index] = reward
+            self._dones[index] = terminated or truncated
+            self._obs[index] = bridge.frame_obs
+            info["TimeLimit.truncated"] = truncated and not terminated
+            infos.append(info)
+
+        done_indices = np.flatnonzero(self._dones)
+        if len(done_indices):
+            for index in done_indices:
+                # save final observation where user can get it, then reset
+                infos[index]["terminal_observation"] = self._obs[index].copy()
+            self._reset_games(done_indices)
+
+        return self._obs.copy(), self._rews.copy(), self._dones.copy(), infos
+
+    def close(self):
+        self._bridge.close()
+
+    def set_stage_config(self, stage_config):
+        """Use *stage_config* for every game from its next reset on."""
+        self._stage_config = stage_config or {}
+        self._encode_resets()
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]